@@ -0,0 +1,167 @@
+"""
+backfill.py
+
+Loads several seasons of history in one job:
+- Fans seasons out across a process pool (one APIIngestion / S3 / Postgres client per process)
+- Every process draws from one global API rate budget hosted by a RateLimiterManager
+- Writes raw JSON under season-partitioned keys (raw/json/epl/history/season=<season>/...)
+- Loads each season into its own LIST partition of the *_history tables, replacing
+  the partition's content so a season can be rerun safely
+
+Example:
+    python backfill.py --from-season 2015 --to-season 2024 --processes 4
+"""
+
+#utility and wrapper imports
+from utilities.logger import get_logger, set_log_context
+from utilities.metrics import metrics
+from clients import make_api, make_s3, make_pg
+from src.rate_limiter import RateLimiterManager
+from clean_players import clean_players
+from clean_teams import clean_teams
+from ingest_players import iter_team_players
+from ingest_teams import ingest_teams_and_store_all_teams
+
+#library imports
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import dotenv
+import pandas as pd
+
+#setting up logger and loading .env
+logger = get_logger(__name__)
+dotenv.load_dotenv()
+
+HISTORY_PREFIX = "raw/json/epl/history"
+
+#history tables are LIST partitioned by season and shaped like the current-season tables
+HISTORY_TABLES = {
+    "teams": ("epl_datapipeline.epl_teams_history", "epl_datapipeline.epl_teams"),
+    "players": ("epl_datapipeline.epl_team_players_history", "epl_datapipeline.epl_team_players"),
+}
+
+def season_s3_key(season, dataset, name):
+    return f"{HISTORY_PREFIX}/season={season}/{dataset}/{name}.json"
+
+def prepare_partitions(pg, seasons):
+    """Creates the history tables and one partition per season up front (in one process)."""
+    partitions = {}
+    for dataset, (parent, like_table) in HISTORY_TABLES.items():
+        for season in seasons:
+            partition = pg.ensure_list_partition(parent, like_table, "season", season)
+            if partition is None:
+                raise RuntimeError(f"Could not prepare partition for {dataset} season {season}")
+            partitions[(dataset, season)] = partition
+    return partitions
+
+def backfill_season(season, rate_limiter, fetch_workers=1, copy_format="csv"):
+    """
+    Runs ingest -> raw upload -> clean -> load for one season inside a worker process.
+    rate_limiter is a RateLimiterManager proxy, so all processes share its budget.
+    Returns a summary dict; failures are reported there instead of raised.
+    """
+    start = time.perf_counter()
+    summary = {"season": season, "teams": 0, "players": 0, "ok": False}
+    metrics.reset()  #pool processes are reused across seasons
+    set_log_context(run_id=f"backfill-{season}")
+
+    api = make_api(season, rate_limiter, pool_size=max(1, fetch_workers))
+    s3 = make_s3()
+    pg = make_pg(max_connections=1)
+    try:
+        teams_df = ingest_teams_and_store_all_teams(
+            api, s3, s3_key=season_s3_key(season, "teams", "teams")
+            )
+        cleaned_teams = clean_teams(teams_df)
+        if cleaned_teams is None or cleaned_teams.empty:
+            logger.warning(f"No teams for season {season}")
+            return summary
+
+        #fetch every roster before touching the partitions, a partial season must not replace a complete one
+        raw, frames = [], []
+        team_ids = cleaned_teams["id"].tolist()
+        for team_id, player_df, raw_json, _ in iter_team_players(api, team_ids, fetch_workers):
+            raw.append((season_s3_key(season, "players", f"{team_id}_players"), raw_json))
+            frames.append(clean_players(player_df))
+        if len(raw) < len(team_ids):
+            logger.error(f"Season {season}: fetched players for {len(raw)} of {len(team_ids)} teams, partitions left unchanged")
+            return summary
+        uploaded = s3.upload_many(raw)
+        if not all(uploaded.values()):
+            logger.warning(f"Season {season}: {list(uploaded.values()).count(False)} raw uploads failed")
+
+        teams_loaded = pg.replace_from_df(
+            cleaned_teams.assign(season=season), f"{HISTORY_TABLES['teams'][0]}_{season}", format=copy_format
+            )
+        players_loaded = False
+        if frames:
+            players_df = pd.concat(frames, ignore_index=True).assign(season=season)
+            players_loaded = pg.replace_from_df(
+                players_df, f"{HISTORY_TABLES['players'][0]}_{season}", format=copy_format
+                )
+            summary["players"] = len(players_df)
+
+        summary["teams"] = len(cleaned_teams)
+        summary["ok"] = bool(teams_loaded and players_loaded and all(uploaded.values()))
+    except Exception as e:
+        logger.exception(f"Backfill of season {season} failed: {e}")
+    finally:
+        api.close()
+        pg.close()
+        summary["seconds"] = round(time.perf_counter() - start, 2)
+        #each process has its own registry, the parent collects them per season
+        summary["metrics"] = metrics.summary()["operations"]
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill a range of seasons into season-partitioned tables")
+    parser.add_argument("--from-season", type=int, required=True)
+    parser.add_argument("--to-season", type=int, required=True, help="inclusive")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--fetch-workers", type=int, default=1, help="concurrent team fetches per process")
+    parser.add_argument("--copy-format", choices=["csv", "binary"], default=os.getenv('PG_COPY_FORMAT', 'csv'))
+    args = parser.parse_args()
+
+    seasons = list(range(args.from_season, args.to_season + 1))
+    if not seasons:
+        parser.error("--to-season must not be before --from-season")
+
+    with make_pg(max_connections=1) as pg:
+        prepare_partitions(pg, seasons)
+
+    failed, summaries = [], []
+    #spawn: workers start clean instead of inheriting the parent's threads and sockets
+    context = multiprocessing.get_context("spawn")
+    with RateLimiterManager(ctx=context) as manager:
+        rate_limiter = manager.RateLimiter(
+            calls_per_minute=float(os.getenv('API_CALLS_PER_MINUTE', 5)),
+            burst=int(os.getenv('API_BURST', 1))
+            )
+        processes = max(1, min(args.processes, len(seasons)))
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            futures = [
+                executor.submit(backfill_season, season, rate_limiter, args.fetch_workers, args.copy_format)
+                for season in seasons
+            ]
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries.append(summary)
+                logger.info(f"Season {summary['season']}: {summary['teams']} teams, "
+                            f"{summary['players']} players in {summary['seconds']}s")
+                if not summary["ok"]:
+                    failed.append(summary["season"])
+
+    if os.getenv('METRICS_JSON_PATH'):
+        metrics.write_json(os.getenv('METRICS_JSON_PATH'), seasons=sorted(summaries, key=lambda s: s["season"]))
+
+    if failed:
+        logger.error(f"Backfill finished with failed seasons: {sorted(failed)}")
+        return 1
+    logger.info(f"Backfill of {len(seasons)} seasons completed successfully!")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
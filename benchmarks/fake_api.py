@@ -0,0 +1,127 @@
+"""
+- Local stand-in for the balldontlie EPL endpoints used by the pipeline
+
+Serves epl/v1/teams and epl/v1/teams/<id>/players from the synthetic generator
+with cursor pagination, a configurable per-request latency and injected 429s:
+
+    with FakeAPIServer(scale=10, latency=0.05, rate_limit_every=50) as server:
+        api = APIIngestion(base_url=server.base_url, season=2024)
+"""
+import re
+import json
+import time
+import random
+import threading
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from benchmarks.synthetic import team_records, player_records
+
+PLAYERS_PATH = re.compile(r"^/epl/v1/teams/(\d+)/players/?$")
+TEAMS_PATH = re.compile(r"^/epl/v1/teams/?$")
+
+
+class FakeAPIServer:
+    """
+    scale:            synthetic data size (see benchmarks/synthetic.py)
+    latency:          seconds added to every response, jitter adds up to that much again at random
+    per_page:         default page size (clients can still send per_page, capped at max_per_page)
+    rate_limit_every: every Nth request is answered with 429 and Retry-After: retry_after
+    """
+    def __init__(self, scale=1, seed=0, latency=0.0, jitter=0.0, per_page=100, max_per_page=100,
+                 rate_limit_every=None, retry_after=1, host="127.0.0.1", port=0):
+        self.scale = scale
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.per_page = per_page
+        self.max_per_page = max_per_page
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.teams = team_records(scale, seed)
+        #rosters are generated once per team and reused by every page request
+        self.players = lru_cache(maxsize=None)(lambda team_id: player_records(team_id, scale, seed))
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _page(self, records, query):
+        per_page = min(int(query.get("per_page", [self.per_page])[0]), self.max_per_page)
+        start = int(query.get("cursor", [0])[0])
+        end = start + per_page
+        meta = {"per_page": per_page}
+        if end < len(records):
+            meta["next_cursor"] = end
+        return {"data": records[start:end], "meta": meta}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  #keep-alive, like the real API behind the pooled session
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    throttled = bool(server.rate_limit_every) and server.requests % server.rate_limit_every == 0
+                    server.rate_limited += throttled
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+
+                if throttled:
+                    self._send(429, {"error": "Too Many Requests"}, {"Retry-After": str(server.retry_after)})
+                    return
+
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                players = PLAYERS_PATH.match(url.path)
+                if players:
+                    team_id = int(players.group(1))
+                    records = server.players(team_id) if 1 <= team_id <= len(server.teams) else []
+                    self._send(200, server._page(records, query))
+                elif TEAMS_PATH.match(url.path):
+                    self._send(200, server._page(server.teams, query))
+                else:
+                    self._send(404, {"error": "Not Found"})
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass  #keep benchmark output clean
+
+        return Handler
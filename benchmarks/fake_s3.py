@@ -0,0 +1,102 @@
+"""
+- In-process stand-in for the boto3 S3 client calls S3Wrapper makes
+"""
+import threading
+from botocore.exceptions import ClientError
+from src.s3_wrapper import S3Wrapper
+
+
+class InMemoryS3Client:
+    """
+    Keeps objects in a dict: put_object, get_object, upload_fileobj, head_object,
+    the multipart upload calls and the list_objects_v2 paginator. Thread-safe, so
+    upload_many's pool can use it.
+    """
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **extra_args):
+        body = Body if isinstance(Body, (bytes, bytearray)) else Body.encode("utf-8")
+        with self.lock:
+            self.objects[(Bucket, Key)] = (bytes(body), extra_args)
+        return {"ETag": f'"{hash(body) & 0xFFFFFFFF:08x}"'}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None, **kwargs):
+        self.put_object(Bucket, Key, Fileobj.read(), **(ExtraArgs or {}))
+
+    def create_multipart_upload(self, Bucket, Key, **extra_args):
+        with self.lock:
+            upload_id = f"upload-{len(self.uploads) + 1}"
+            self.uploads[upload_id] = ({}, extra_args)
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            self.uploads[UploadId][0][PartNumber] = bytes(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        with self.lock:
+            parts, extra_args = self.uploads.pop(UploadId)
+            body = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+            self.objects[(Bucket, Key)] = (body, extra_args)
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        with self.lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            stored = self.objects.get((Bucket, Key))
+        if stored is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject")
+        body, extra_args = stored
+        return {"Body": _Body(body), "ContentLength": len(body), **extra_args}
+
+    def head_object(self, Bucket, Key):
+        with self.lock:
+            stored = self.objects.get((Bucket, Key))
+        if stored is None:
+            raise ClientError({"Error": {"Code": "404", "Message": Key}}, "HeadObject")
+        return {"ContentLength": len(stored[0]), **stored[1]}
+
+    def get_paginator(self, operation):
+        if operation != "list_objects_v2":
+            raise NotImplementedError(operation)
+        return _ListPaginator(self)
+
+    @property
+    def total_bytes(self):
+        with self.lock:
+            return sum(len(body) for body, _ in self.objects.values())
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class _ListPaginator:
+    def __init__(self, client, page_size=1000):
+        self.client = client
+        self.page_size = page_size
+
+    def paginate(self, Bucket, Prefix=""):
+        with self.client.lock:
+            keys = sorted(key for bucket, key in self.client.objects if bucket == Bucket and key.startswith(Prefix))
+        for start in range(0, len(keys), self.page_size):
+            yield {"Contents": [{"Key": key} for key in keys[start:start + self.page_size]]}
+
+
+def in_memory_s3(bucket="benchmark", **kwargs):
+    """An S3Wrapper (same encoding / multipart / pooling code paths) backed by InMemoryS3Client."""
+    s3 = S3Wrapper("benchmark", "benchmark", "us-east-1", bucket, **kwargs)
+    s3.s3_client = InMemoryS3Client()
+    return s3
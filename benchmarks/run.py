@@ -0,0 +1,221 @@
+"""
+benchmarks/run.py
+
+Repeatable throughput / peak-memory numbers for the pipeline's hot paths, with no
+live API, AWS or Postgres needed:
+- ingest:    APIIngestion against the local fake API + raw uploads to in-memory S3
+- clean:     clean_players on a synthetic raw roster frame
+- qa:        DataQualityChecker.profile (single pass) on the cleaned frame
+- qa_checks: the per-check DataQualityChecker methods on the same frame
+- copy:      copy_from_df into a file sink, or a temp table when --pg-dsn is given
+
+Each benchmark runs --repeat times (best and median wall time are reported), then
+once more under tracemalloc for peak memory. The per-operation breakdown from
+utilities/metrics.py of the last timed run is included in the JSON output.
+
+Example:
+    python -m benchmarks.run --scales 1 10 100 --output bench.json
+    python -m benchmarks.run --benchmarks ingest --latency 0.05 --rate-limit-every 25
+"""
+import gc
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+import pandas as pd
+
+from utilities.metrics import metrics
+from src.api_ingestor import APIIngestion
+from src.rate_limiter import RateLimiter
+from src.qa_checker import DataQualityChecker
+from src.schemas import PLAYER_SCHEMA
+from clean_players import clean_players
+from ingest_players import iter_team_players, players_s3_key
+from benchmarks.synthetic import raw_players_frame
+from benchmarks.fake_api import FakeAPIServer
+from benchmarks.fake_s3 import in_memory_s3
+from benchmarks.sinks import copy_target
+
+MB = 1024 * 1024
+
+
+def prepare_ingest(scale, args, stack):
+    server = stack(FakeAPIServer(
+        scale=scale, seed=args.seed, latency=args.latency, jitter=args.jitter,
+        per_page=args.per_page, rate_limit_every=args.rate_limit_every, retry_after=args.retry_after
+        ))
+    s3 = in_memory_s3(max_workers=args.workers, content_encoding=args.content_encoding)
+
+    def run():
+        limiter = RateLimiter(args.api_calls_per_minute, burst=args.workers) if args.api_calls_per_minute else None
+        sent = server.bytes_sent
+        with APIIngestion(base_url=server.base_url, season=2024, rate_limiter=limiter,
+                          pool_size=args.workers, backoff_factor=0.05) as api:
+            teams = api.fetch("epl/v1/teams")
+            rows, raw = 0, []
+            for team_id, player_df, raw_json, _ in iter_team_players(api, teams["id"].tolist(), args.workers):
+                rows += len(player_df)
+                raw.append((players_s3_key(team_id), raw_json))
+        s3.upload_many(raw)
+        return rows, server.bytes_sent - sent
+    return run
+
+
+def prepare_clean(scale, args, stack):
+    raw = raw_players_frame(scale, args.seed)
+    return lambda: (len(clean_players(raw)), int(raw.memory_usage(deep=True).sum()))
+
+
+def _cleaned(scale, args):
+    return clean_players(raw_players_frame(scale, args.seed))
+
+
+def prepare_qa(scale, args, stack):
+    cleaned = _cleaned(scale, args)
+    expected = dict(PLAYER_SCHEMA)
+
+    def run():
+        report = DataQualityChecker(cleaned).profile(key_columns=["id"], expected_dtypes=expected)
+        return report["rows"], int(cleaned.memory_usage(deep=True).sum())
+    return run
+
+
+def prepare_qa_checks(scale, args, stack):
+    cleaned = _cleaned(scale, args)
+
+    def run():
+        checker = DataQualityChecker(cleaned)
+        checker.check_nulls()
+        checker.check_duplicates()
+        checker.check_schema(list(cleaned.columns))
+        return len(cleaned), int(cleaned.memory_usage(deep=True).sum())
+    return run
+
+
+def prepare_copy(scale, args, stack):
+    cleaned = _cleaned(scale, args)
+    pg, table = stack(copy_target(args.pg_dsn, args.sink_path))
+
+    def run():
+        pg.run_command(f"TRUNCATE {table}")
+        metrics.reset()
+        if not pg.copy_from_df(cleaned, table, chunk_rows=args.chunk_rows, format=args.copy_format):
+            raise RuntimeError(f"COPY into {table} failed")
+        copied = metrics.summary()["operations"].get("pg.copy", {})
+        return copied.get("rows", len(cleaned)), copied.get("bytes", 0)
+    return run
+
+
+BENCHMARKS = {
+    "ingest": prepare_ingest,
+    "clean": prepare_clean,
+    "qa": prepare_qa,
+    "qa_checks": prepare_qa_checks,
+    "copy": prepare_copy,
+}
+
+
+def measure(run, repeat=3, memory=True):
+    """Times run() repeat times, then measures peak traced memory of one more run."""
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        metrics.reset()
+        start = time.perf_counter()
+        rows, nbytes = run()
+        seconds.append(time.perf_counter() - start)
+    operations = metrics.summary()["operations"]
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    best = min(seconds)
+    return {
+        "rows": rows,
+        "bytes": nbytes,
+        "best_seconds": round(best, 4),
+        "median_seconds": round(statistics.median(seconds), 4),
+        "rows_per_second": round(rows / best, 1) if best else None,
+        "mb_per_second": round(nbytes / MB / best, 2) if best else None,
+        "peak_memory_mb": round(peak / MB, 2) if peak is not None else None,
+        "operations": operations,
+    }
+
+
+def run_benchmark(name, scale, args):
+    resources = []
+    def stack(resource):
+        #context managers (fake server, COPY target) live for the whole benchmark
+        entered = resource.__enter__()
+        resources.append(resource)
+        return entered
+    try:
+        run = BENCHMARKS[name](scale, args, stack)
+        return measure(run, args.repeat, not args.no_memory)
+    finally:
+        for resource in reversed(resources):
+            resource.__exit__(None, None, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, cleaning, QA and COPY on synthetic EPL data")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--scales", nargs="+", type=float, default=[1, 10],
+                        help="data size relative to one real season (1 to 10000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory run")
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    #ingest
+    parser.add_argument("--workers", type=int, default=4, help="concurrent team fetches / S3 uploads")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake API latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--rate-limit-every", type=int, help="fake API answers every Nth request with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--api-calls-per-minute", type=float, help="client-side RateLimiter budget")
+    parser.add_argument("--content-encoding", choices=["gzip", "zstd"])
+    #copy
+    parser.add_argument("--pg-dsn", help="e.g. 'dbname=epl user=postgres password=... host=localhost'")
+    parser.add_argument("--sink-path", default="/dev/null", help="file sink used without --pg-dsn")
+    parser.add_argument("--copy-format", choices=["csv", "binary"], default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    #keep the pipeline's per-team INFO records out of the timed sections
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    print(f"{'benchmark':<10} {'scale':>8} {'rows':>10} {'best s':>9} {'rows/s':>12} {'MB/s':>8} {'peak MB':>9}")
+    for name in args.benchmarks:
+        for scale in args.scales:
+            result = {"benchmark": name, "scale": scale, **run_benchmark(name, scale, args)}
+            results.append(result)
+            print(f"{name:<10} {scale:>8g} {result['rows']:>10} {result['best_seconds']:>9.4f} "
+                  f"{result['rows_per_second'] or 0:>12.0f} {result['mb_per_second'] or 0:>8.2f} "
+                  f"{result['peak_memory_mb'] if result['peak_memory_mb'] is not None else '-':>9}")
+
+    if args.output:
+        environment = {
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment, "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+- COPY targets for benchmarks: a file sink (no database needed) or a temp table in a real Postgres
+"""
+import os
+from contextlib import contextmanager
+from src.postgres_wrapper import PostgresWrapper
+
+#binary COPY wire types of the cleaned players frame
+PLAYER_COLUMN_TYPES = {
+    "id": "int4",
+    "position": "varchar",
+    "national_team": "varchar",
+    "height": "int2",
+    "weight": "int2",
+    "birth_date": "varchar",
+    "age": "varchar",
+    "name": "varchar",
+    "first_name": "varchar",
+    "last_name": "varchar",
+    "team_id": "int2",
+}
+
+PLAYER_TABLE_DDL = (
+    "CREATE TEMP TABLE {table} (id integer, position varchar, national_team varchar, height smallint, "
+    "weight smallint, birth_date varchar, age varchar, name varchar, first_name varchar, "
+    "last_name varchar, team_id smallint)"
+)
+
+
+class _FileCursor:
+    def __init__(self, sink):
+        self.sink = sink
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def execute(self, sql, params=None):
+        pass  #DDL / TRUNCATE have nothing to do on a file
+
+    def copy_expert(self, sql, stream, size=8192):
+        while True:
+            data = stream.read(size)
+            if not data:
+                return
+            self.sink.write(data)
+
+    def close(self):
+        pass
+
+
+class FileSinkConnection:
+    """Connection-like object whose COPY FROM STDIN writes the stream to a file."""
+    def __init__(self, path=os.devnull):
+        self.file = open(path, "wb")
+        self.closed = 0
+
+    def cursor(self, *args, **kwargs):
+        return _FileCursor(self.file)
+
+    def commit(self):
+        self.file.flush()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.file.close()
+        self.closed = 1
+
+
+class FileSinkPostgres(PostgresWrapper):
+    """
+    PostgresWrapper whose single connection is a FileSinkConnection, so copy_from_df
+    runs its real chunking / encoding / streaming path without a server.
+    column_types stands in for the pg_attribute lookup binary COPY needs.
+    """
+    def __init__(self, path=os.devnull, column_types=None):
+        self.max_connections = 1
+        self.slots = None
+        self.pool = None
+        self.conn = FileSinkConnection(path)
+        self.cursor = self.conn.cursor()
+        self.types = column_types or PLAYER_COLUMN_TYPES
+
+    def column_types(self, table, conn=None):
+        return dict(self.types)
+
+    def close(self):
+        self.conn.close()
+
+
+@contextmanager
+def copy_target(dsn=None, path=os.devnull, table="benchmark_players"):
+    """
+    Yields (pg, table). With a dsn (key=value string) a temp table is created on a real
+    Postgres connection; otherwise COPY goes to a file sink (os.devnull by default).
+    """
+    if not dsn:
+        pg = FileSinkPostgres(path)
+        try:
+            yield pg, table
+        finally:
+            pg.close()
+        return
+
+    params = dict(part.split("=", 1) for part in dsn.split())
+    pg = PostgresWrapper(
+        db_name=params.get("dbname"),
+        user=params.get("user"),
+        password=params.get("password"),
+        host=params.get("host", "localhost"),
+        port=int(params.get("port", 5432))
+        )
+    try:
+        with pg.conn.cursor() as cursor:
+            cursor.execute(PLAYER_TABLE_DDL.format(table=table))
+        pg.conn.commit()
+        yield pg, table
+    finally:
+        pg.close()
@@ -0,0 +1,84 @@
+"""
+- Synthetic EPL teams / players shaped like the balldontlie API payloads
+
+scale=1 is roughly a real season (20 teams, ~30 players each); rosters grow with
+the scale so scale=10_000 gives ~6M players. Generation is vectorized and seeded,
+so the same (scale, seed) always produces the same data.
+"""
+import numpy as np
+import pandas as pd
+
+TEAMS_PER_SEASON = 20
+PLAYERS_PER_TEAM = 30
+POSITIONS = ["Goalkeeper", "Defender", "Midfielder", "Forward"]
+NATIONS = ["England", "France", "Spain", "Brazil", "Portugal", "Germany", "Netherlands",
+           "Argentina", "Belgium", "Norway", "Scotland", "Wales", "Ireland", "Nigeria", "Japan"]
+FIRST_NAMES = ["James", "Harry", "Jack", "Bukayo", "Mohamed", "Kevin", "Bruno", "Martin",
+               "Declan", "Phil", "Cole", "Erling", "Son", "Virgil", "Trent", "Marcus"]
+LAST_NAMES = ["Smith", "Kane", "Grealish", "Saka", "Salah", "De Bruyne", "Fernandes", "Odegaard",
+              "Rice", "Foden", "Palmer", "Haaland", "Heung-min", "van Dijk", "Alexander-Arnold", "Rashford"]
+CITIES = ["London", "Manchester", "Liverpool", "Birmingham", "Newcastle", "Brighton", "Leicester",
+          "Nottingham", "Southampton", "Wolverhampton"]
+
+
+def team_records(scale=1, seed=0):
+    """List of team dicts as returned by epl/v1/teams (one season has 20 teams at any scale)."""
+    rng = np.random.default_rng(seed)
+    teams = []
+    for team_id in range(1, TEAMS_PER_SEASON + 1):
+        city = CITIES[rng.integers(len(CITIES))]
+        teams.append({
+            "id": team_id,
+            "name": f"{city} FC {team_id}",
+            "short_name": f"{city} {team_id}",
+            "abbr": f"T{team_id:02d}",
+            "city": city,
+            "stadium": f"{city} Stadium {team_id}",
+        })
+    return teams
+
+
+def players_frame(team_id, scale=1, seed=0, null_rate=0.01):
+    """
+    One team's roster (PLAYERS_PER_TEAM * scale players) as the raw, not yet cleaned
+    DataFrame the ingest step produces. null_rate of the rows get a missing field so
+    drop_nulls has work to do.
+    """
+    rng = np.random.default_rng([seed, team_id])
+    n = max(1, int(PLAYERS_PER_TEAM * scale))
+
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(len(FIRST_NAMES), size=n)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(len(LAST_NAMES), size=n)]
+    birth = np.datetime64("1985-01-01") + rng.integers(0, 20 * 365, size=n).astype("timedelta64[D]")
+    age_days = (np.datetime64("2024-08-16") - birth).astype(int)
+
+    df = pd.DataFrame({
+        "id": team_id * 10_000_000 + np.arange(n),
+        "position": np.array(POSITIONS, dtype=object)[rng.integers(len(POSITIONS), size=n)],
+        "national_team": np.array(NATIONS, dtype=object)[rng.integers(len(NATIONS), size=n)],
+        "height": rng.integers(165, 200, size=n),
+        "weight": rng.integers(60, 95, size=n),
+        "birth_date": pd.Series(birth).dt.strftime("%Y-%m-%dT00:00:00.000Z"),
+        "age": pd.Series(age_days // 365).astype(str) + " years " + pd.Series(age_days % 365).astype(str) + " days",
+        "name": first + " " + last,
+        "first_name": first,
+        "last_name": last,
+    })
+    if null_rate:
+        missing = rng.random(n) < null_rate
+        df["national_team"] = df["national_team"].where(~missing, None)
+    return df
+
+
+def player_records(team_id, scale=1, seed=0, null_rate=0.01):
+    """One team's roster as the list of dicts the API returns."""
+    return players_frame(team_id, scale, seed, null_rate).to_dict(orient="records")
+
+
+def raw_players_frame(scale=1, seed=0, null_rate=0.01):
+    """Every team's roster with team_id added, i.e. the input of clean_players."""
+    return pd.concat(
+        [players_frame(team_id, scale, seed, null_rate).assign(team_id=team_id)
+         for team_id in range(1, TEAMS_PER_SEASON + 1)],
+        ignore_index=True
+    )
@@ -1,5 +1,6 @@
 from utilities.logger import get_logger
 from src.data_cleaner import DataCleaner
+from src.schemas import PLAYER_SCHEMA
 
 logger = get_logger(__name__)
 
@@ -10,25 +11,24 @@ def clean_players(players_df):
     
     logger.info(f"Cleaning players DataFrame with {len(players_df)} rows.")
 
+    expected_columns = [
+    'id', 'position', 'national_team', 'height', 'weight',
+    'birth_date', 'age', 'name', 'first_name', 'last_name', 'team_id'
+    ]
+
+    #lazy: the plan is optimized and run once in get_df (casts only touch kept columns)
+    #apply_schema gives compact dtypes: categoricals, int16/int32, dates and age in days
     cleaner = (
-        DataCleaner(players_df)
+        DataCleaner(players_df, lazy=True)
         .drop_nulls()
         .lower_columns()
-        .cast_column_types({
-            "height": "int",
-            "weight": "int"
-        })
         .fill_nulls()
+        .select_columns(expected_columns)
+        .apply_schema(PLAYER_SCHEMA)
         )
     
     cleaned_players = cleaner.get_df()
 
-    expected_columns = [
-    'id', 'position', 'national_team', 'height', 'weight',
-    'birth_date', 'age', 'name', 'first_name', 'last_name', 'team_id'
-    ]
-    cleaned_players = cleaned_players[expected_columns]
-
     logger.info(f"Cleaning complete. Output rows: {len(cleaned_players)}")
 
 
@@ -1,5 +1,6 @@
 from utilities.logger import get_logger
 from src.data_cleaner import DataCleaner
+from src.schemas import TEAM_SCHEMA
 
 logger = get_logger(__name__)
 
@@ -11,10 +12,11 @@ def clean_teams(teams_df):
     logger.info(f"Cleaning teams DataFrame with {len(teams_df)} rows.")
 
     cleaned_df = (
-        DataCleaner(teams_df)
+        DataCleaner(teams_df, lazy=True)
         .drop_nulls()
         .lower_columns()
         .fill_nulls()
+        .apply_schema(TEAM_SCHEMA)
         .get_df()
         )
     
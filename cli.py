@@ -0,0 +1,192 @@
+"""
+cli.py
+
+Entry point with one subcommand per stage, for scheduled jobs that only need part
+of the pipeline:
+    ingest  API -> raw JSON in S3 (teams and players)
+    clean   raw JSON in S3 -> cleaned file (.parquet or .csv)
+    load    cleaned file (or raw JSON in S3, cleaned on the fly) -> Postgres
+    qa      profile cleaned data (or a loaded table), exits 1 when duplicate keys are found
+    export  stream a Postgres table straight to S3 (compressed CSV or Parquet)
+    run     the full pipeline DAG (same as main.py, accepts --resume)
+
+Only argparse is imported at startup: each subcommand imports the modules it needs
+and clients are created on first use (see clients.py), so `--help` or a partial run
+never loads boto3 / psycopg2 / requests it doesn't use.
+
+Example:
+    python cli.py ingest --workers 4
+    python cli.py clean --dataset players --output players.parquet
+    python cli.py load --dataset players --input players.parquet --mode upsert
+"""
+import os
+import sys
+import argparse
+
+DATASET_CHOICES = ["teams", "players"]
+
+
+def cmd_ingest(args, clients):
+    from ingest_teams import ingest_teams_and_store_all_teams
+    from ingest_players import fetch_and_store_all_players_raw
+
+    teams_df = ingest_teams_and_store_all_teams(clients.api, clients.s3)
+    if teams_df is None or teams_df.empty:
+        return 1
+    workers = args.workers or int(os.getenv('API_MAX_WORKERS', clients.rate_limiter.max_in_flight))
+    players_df = fetch_and_store_all_players_raw(clients.api, clients.s3, teams_df["id"].tolist(), max_workers=workers)
+    return 0 if not players_df.empty else 1
+
+
+def _cleaned_from_s3(dataset, clients):
+    import pandas as pd
+    from reprocess import DATASETS, iter_raw_frames
+
+    config = DATASETS[dataset]
+    frames = [config["clean"](raw_df) for raw_df in iter_raw_frames(clients.s3, config["prefix"])]
+    frames = [df for df in frames if df is not None and not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _read_cleaned(path):
+    import pandas as pd
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def cmd_clean(args, clients):
+    from utilities.logger import get_logger
+    logger = get_logger(__name__)
+
+    cleaned = _cleaned_from_s3(args.dataset, clients)
+    if cleaned.empty:
+        logger.warning(f"No {args.dataset} data to clean")
+        return 1
+    if args.output.endswith(".parquet"):
+        cleaned.to_parquet(args.output, index=False)
+    else:
+        cleaned.to_csv(args.output, index=False)
+    logger.info(f"Wrote {len(cleaned)} cleaned {args.dataset} rows to {args.output}")
+    return 0
+
+
+def cmd_load(args, clients):
+    from reprocess import DATASETS, reprocess_dataset
+    from pg_upload import pg_upload
+
+    if args.input:
+        table = DATASETS[args.dataset]["table"]
+        if args.truncate:
+            clients.pg.run_command(f"TRUNCATE {table}")
+        loaded = pg_upload(clients.pg, _read_cleaned(args.input), table, workers=args.workers, mode=args.mode)
+        return 0 if loaded else 1
+
+    datasets = DATASET_CHOICES if args.dataset == "all" else [args.dataset]
+    loaded = [
+        reprocess_dataset(clients.s3, clients.pg, dataset, truncate=args.truncate, load_workers=args.workers, mode=args.mode)
+        for dataset in datasets
+    ]
+    return 0 if all(loaded) else 1
+
+
+def cmd_qa(args, clients):
+    from src.qa_checker import DataQualityChecker, log_profile
+
+    if args.table:
+        #profiled chunk by chunk from a server-side cursor, memory stays flat whatever the table size
+        from src.profiler import DataProfiler
+        chunks = clients.pg.iter_query(f"SELECT * FROM {args.table}", chunk_rows=args.chunk_rows)
+        report = DataProfiler.profile(chunks, key_columns=args.key_columns).report()
+        log_profile(report)
+    else:
+        df = _read_cleaned(args.input) if args.input else _cleaned_from_s3(args.dataset, clients)
+        #profile() logs its findings itself and returns None when profiling failed
+        report = DataQualityChecker(df).profile(key_columns=args.key_columns)
+    if report is None:
+        return 1
+    return 1 if report["rows"] == 0 or report["duplicates"] else 0
+
+
+def cmd_export(args, clients):
+    from clients import make_pg
+
+    #one pooled connection per parallel key range, plus the primary one
+    clients.pg = make_pg(max_connections=max(1, args.partitions) + 1)
+    keys = clients.pg.export_to_s3(
+        args.table, clients.s3, args.s3_key,
+        format=args.format,
+        content_encoding="" if args.encoding == "none" else args.encoding,
+        key_column=args.key_column,
+        partitions=args.partitions,
+        batch_rows=args.batch_rows
+        )
+    return 0 if keys else 1
+
+
+def cmd_run(args, clients):
+    from main import main as run_pipeline
+    argv = [] if args.resume is None else ["--resume", args.resume]
+    return run_pipeline(argv)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="EPL data pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="fetch teams and players, store raw JSON in S3")
+    ingest.add_argument("--season", type=int, default=2024)
+    ingest.add_argument("--workers", type=int, help="concurrent team fetches (default: API_MAX_WORKERS)")
+    ingest.set_defaults(func=cmd_ingest)
+
+    clean = commands.add_parser("clean", help="clean raw JSON from S3 into a local file")
+    clean.add_argument("--dataset", choices=DATASET_CHOICES, required=True)
+    clean.add_argument("--output", required=True, help=".parquet (needs pyarrow) or .csv")
+    clean.set_defaults(func=cmd_clean)
+
+    load = commands.add_parser("load", help="load cleaned data into Postgres")
+    load.add_argument("--dataset", choices=[*DATASET_CHOICES, "all"], default="all")
+    load.add_argument("--input", help="cleaned file from `clean`; without it raw JSON in S3 is cleaned and loaded")
+    load.add_argument("--mode", choices=["append", "upsert"], default=os.getenv('PG_LOAD_MODE', 'append'))
+    load.add_argument("--workers", type=int, default=int(os.getenv('PG_LOAD_WORKERS', 1)))
+    load.add_argument("--truncate", action="store_true")
+    load.set_defaults(func=cmd_load)
+
+    qa = commands.add_parser("qa", help="profile cleaned data (exit code 1 on duplicate keys)")
+    qa.add_argument("--dataset", choices=DATASET_CHOICES, default="players")
+    qa.add_argument("--input", help="cleaned file; without it raw JSON in S3 is cleaned first")
+    qa.add_argument("--table", help="profile a Postgres table instead, streamed in --chunk-rows chunks")
+    qa.add_argument("--chunk-rows", type=int, default=50_000)
+    qa.add_argument("--key-columns", nargs="+", default=["id"])
+    qa.set_defaults(func=cmd_qa)
+
+    export = commands.add_parser("export", help="stream a table from Postgres to S3 without local files")
+    export.add_argument("--table", required=True)
+    export.add_argument("--s3-key", required=True, help="object key, or key prefix with --partitions > 1")
+    export.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export.add_argument("--encoding", choices=["gzip", "zstd", "none"], default="gzip", help="csv only")
+    export.add_argument("--key-column", help="integer column used to split the export into ranges")
+    export.add_argument("--partitions", type=int, default=1, help="ranges exported in parallel")
+    export.add_argument("--batch-rows", type=int, default=100_000, help="rows per Parquet row group")
+    export.set_defaults(func=cmd_export)
+
+    run = commands.add_parser("run", help="run the full pipeline")
+    run.add_argument("--resume", nargs="?", const="latest", default=None, metavar="RUN_ID")
+    run.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "load" and args.input and args.dataset == "all":
+        build_parser().error("load --input needs a single --dataset")
+
+    import dotenv
+    dotenv.load_dotenv()
+    from clients import Clients
+    from utilities.logger import log_context
+
+    with Clients(season=getattr(args, "season", 2024)) as clients, log_context(stage=args.command):
+        return args.func(args, clients)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
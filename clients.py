@@ -0,0 +1,106 @@
+"""
+clients.py
+
+Builds the API, S3 and Postgres clients from environment variables (see README).
+The make_* helpers import their wrapper (and requests / boto3 / psycopg2 behind it)
+only when called, and Clients creates each client on first attribute access, so a
+command that only needs S3 never pays for the API session or a database connection.
+"""
+import os
+from functools import cached_property
+
+API_BASE_URL = 'https://api.balldontlie.io/'
+S3_BUCKET = 't1-de-prep'
+
+def env_flag(name):
+    return os.getenv(name, '').lower() in ('1', 'true', 'yes')
+
+def make_rate_limiter():
+    from src.rate_limiter import RateLimiter
+    return RateLimiter(
+        calls_per_minute=float(os.getenv('API_CALLS_PER_MINUTE', 5)),
+        burst=int(os.getenv('API_BURST', 1))
+        )
+
+def make_cache():
+    cache_dir = os.getenv('API_CACHE_DIR')
+    if not cache_dir:
+        return None
+    from src.response_cache import ResponseCache
+    return ResponseCache(
+        cache_dir,
+        ttl=float(os.getenv('API_CACHE_TTL', 3600)),
+        max_bytes=int(os.getenv('API_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+        )
+
+def make_api(season=2024, rate_limiter=None, pool_size=None):
+    from src.api_ingestor import APIIngestion
+    return APIIngestion(
+        base_url=API_BASE_URL,
+        season=season,
+        headers={"Authorization": f"Bearer {os.getenv('API_KEY')}"},
+        rate_limiter=rate_limiter,
+        pool_size=pool_size or int(os.getenv('API_POOL_SIZE', 10)),
+        timeout=(float(os.getenv('API_CONNECT_TIMEOUT', 5)), float(os.getenv('API_READ_TIMEOUT', 30))),
+        max_retries=int(os.getenv('API_MAX_RETRIES', 3)),
+        cache=make_cache(),
+        offline=env_flag('API_OFFLINE')
+        )
+
+def make_s3(max_workers=None):
+    from src.s3_wrapper import S3Wrapper
+    return S3Wrapper(
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_KEY'),
+        region=os.getenv('AWS_REGION'),
+        bucket=S3_BUCKET,
+        max_workers=max_workers or int(os.getenv('S3_MAX_WORKERS', 8)),
+        content_encoding=os.getenv('S3_CONTENT_ENCODING') or None)
+
+def make_pg(max_connections=None):
+    from src.postgres_wrapper import PostgresWrapper
+    return PostgresWrapper(
+        db_name=os.getenv('POSTGRES_DB'),
+        user=os.getenv('POSTGRES_USER'),
+        password=os.getenv('POSTGRES_PASSWORD'),
+        host='localhost',
+        port=5432,
+        max_connections=max_connections or int(os.getenv('PG_MAX_CONNECTIONS', 1))
+        )
+
+
+class Clients:
+    """
+    Lazily created clients shared by one command: clients.api, clients.s3, clients.pg
+    (and clients.rate_limiter) are built on first use. close() only touches the
+    clients that were actually created.
+    """
+    def __init__(self, season=2024):
+        self.season = season
+
+    @cached_property
+    def rate_limiter(self):
+        return make_rate_limiter()
+
+    @cached_property
+    def api(self):
+        return make_api(self.season, self.rate_limiter)
+
+    @cached_property
+    def s3(self):
+        return make_s3()
+
+    @cached_property
+    def pg(self):
+        return make_pg()
+
+    def close(self):
+        for name in ("api", "pg"):
+            if name in self.__dict__:
+                self.__dict__.pop(name).close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
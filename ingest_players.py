@@ -1,51 +1,142 @@
-import time
+import contextvars
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from utilities.logger import get_logger
+from src.json_decoder import raw_document
+from src.schemas import PLAYER_API_SCHEMA
 
 logger = get_logger(__name__)
 
-def fetch_and_store_all_players_raw(api,s3, team_ids):
+def players_s3_key(team_id):
+    return f"raw/json/epl/players/{team_id}_players.json"
+
+def fetch_team_players(api, team_id, manifest=None, on_unchanged=None):
+    """
+    Fetches the players for a single team and adds the team_id column.
+    Returns (player_df, raw_json_bytes, digest) or None.
+
+    The frame is decoded straight from the response bytes with PLAYER_API_SCHEMA and
+    the raw document is built from those same bytes, so nothing is re-serialized.
+
+    When a ChangeManifest is given, rosters whose content hash matches the last
+    successful run are skipped (not uploaded, not returned for cleaning/loading).
+    """
+    try:
+        player_df, pages = api.fetch_with_raw("epl/v1/teams", PLAYER_API_SCHEMA, team_id=team_id)
+        if pages:
+            player_df["team_id"] = team_id
+            records = raw_document(pages, team_id=team_id)
+
+            digest = None
+            if manifest is not None:
+                digest = manifest.content_hash(records)
+                if not manifest.has_changed(team_id, digest):
+                    logger.info(f"Roster unchanged for team ID: {team_id}, skipping")
+                    if on_unchanged is not None:
+                        on_unchanged(team_id)
+                    return None
+
+            logger.info(f"Fetched player data for team ID: {team_id}")
+            return player_df, records, digest
+        else:
+            logger.warning(f"No data returned to team ID: {team_id}")
+    except Exception as e:
+        logger.warning(f"Error processing team ID {team_id}: {e}")
+    return None
+
+def iter_team_players(api, team_ids, max_workers=1, manifest=None, on_unchanged=None):
+    """
+    Generator yielding (team_id, player_df, raw_json_bytes, digest) for every team whose
+    roster was fetched (and changed, when a manifest is given), in completion order,
+    so downstream stages can start on a team as soon as it arrives.
+    on_unchanged(team_id) is called for rosters skipped by the manifest.
+    """
+    if max_workers > 1:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            #each task runs in a copy of the caller's context, so its log records keep the stage
+            futures = {
+                executor.submit(contextvars.copy_context().run, fetch_team_players, api, team_id, manifest, on_unchanged): team_id
+                for team_id in team_ids
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None:
+                    yield (futures[future], *result)
+        finally:
+            #closed early (consumer failed or stopped): drop the queued fetches instead of
+            #running every remaining team, only waits for the ones already in flight
+            executor.shutdown(cancel_futures=True)
+    else:
+        for team_id in team_ids:
+            result = fetch_team_players(api, team_id, manifest, on_unchanged)
+            if result is not None:
+                yield (team_id, *result)
+
+def store_team_players_raw(s3, team_id, raw_json, season=None, manifest=None, digest=None, parquet_prefix=None, player_df=None):
+    """
+    Uploads one team's raw players JSON (and optional Parquet partition) to s3 and
+    stages its manifest hash once the upload succeeded. Returns True on success.
+    """
+    uploaded = s3.s3_upload_bytes(raw_json, players_s3_key(team_id))
+    if uploaded and manifest is not None:
+        manifest.stage(team_id, digest)
+    if parquet_prefix and player_df is not None:
+        s3.s3_upload_parquet(
+            player_df.assign(season=season),
+            prefix=parquet_prefix,
+            partition_cols=["season", "team_id"]
+        )
+    return uploaded
+
+def fetch_and_store_all_players_raw(api,s3, team_ids, max_workers=1, manifest=None, parquet_prefix=None):
     """
     This function does two main things:
-    
-    1.  It isolates the players API call from the teams API call. Additionally, 
-        the players data result from the API does not include the team_id. The data is - 
-        then returned to a clean dataframe with the team_id column created. 
+
+    1.  It isolates the players API call from the teams API call. Additionally,
+        the players data result from the API does not include the team_id. The data is -
+        then returned to a clean dataframe with the team_id column created.
 
     2.  The function uploads the raw json results to s3 and assigns each file it's respective
         team id.
 
-    Notes: 
-        "time.sleep(12)" is included to respect the request limit of the API(5 calls per minute).
-        There are 20 teams total, if I looped through based on team_id without method, the script 
-        will produce an error.  
+    Notes:
+        Request pacing is handled by the RateLimiter attached to the api (5 calls per minute
+        on the free tier). With max_workers > 1 teams are fetched concurrently, the limiter
+        decides how many of those requests are actually in flight at any time.
+        With a manifest only teams whose roster changed since the last committed run are
+        returned, the caller commits the manifest once those rows are loaded.
+        With a parquet_prefix the raw frames are also written as Parquet partitioned by
+        season/team_id.
     """
     logger.info("Players ingestion starting....")
 
-    all_players = []
-    for team_id in team_ids:
-        try:
-            player_df = api.fetch("epl/v1/teams", team_id=team_id)
-            if player_df is not None:
-                player_df["team_id"] = team_id
-                all_players.append(player_df)
-
-                #Step 3B: Upload raw JSON for each team's players
-                s3.s3_upload_raw_json(
-                    data=player_df.to_dict(orient="records"),
-                    s3_key=f"raw/json/epl/players/{team_id}_players.json",
-                    include_ts=False
-                )
-                logger.info(f"Fetched and uploaded player data for team ID: {team_id}")
-            else:
-                logger.warning(f"No data returned to team ID: {team_id}")
-        except Exception as e:
-            logger.warning(f"Error processing team ID {team_id}: {e}")
-        time.sleep(15)  # obey free-tier API limit    
-    
-    if not all_players:
-        logger.warning("No player data was fetched for any team.")
+    results = {team_id: result for team_id, *result in iter_team_players(api, team_ids, max_workers, manifest)}
+    fetched = {team_id: results[team_id] for team_id in team_ids if team_id in results}
+
+    if not fetched:
+        if manifest is not None:
+            logger.info("No roster changes since the last run.")
+        else:
+            logger.warning("No player data was fetched for any team.")
         return pd.DataFrame()
-    
+
+    #Step 3B: Upload raw JSON for each team's players in one concurrent batch
+    uploaded = s3.upload_many(
+        (players_s3_key(team_id), records) for team_id, (_, records, _) in fetched.items()
+    )
+    if manifest is not None:
+        for team_id, (_, _, digest) in fetched.items():
+            if uploaded.get(players_s3_key(team_id)):
+                manifest.stage(team_id, digest)
+
+    players_df = pd.concat([player_df for player_df, _, _ in fetched.values()], ignore_index=True)
+    if parquet_prefix:
+        s3.s3_upload_parquet(
+            players_df.assign(season=api.season),
+            prefix=parquet_prefix,
+            partition_cols=["season", "team_id"]
+        )
+
     logger.info("Players ingestion complete!")
-    return pd.concat(all_players, ignore_index=True)
\ No newline at end of file
+    return players_df
@@ -1,30 +1,44 @@
 import pandas as pd
 from utilities.logger import get_logger
+from src.json_decoder import raw_document
+from src.schemas import TEAM_API_SCHEMA
 
 logger = get_logger(__name__)
 
-def ingest_teams_and_store_all_teams(api,s3):
+def teams_s3_key(season):
+    return f"raw/json/teams/{season}_teams.json"
+
+def ingest_teams_and_store_all_teams(api,s3,parquet_prefix=None,s3_key=None):
     """
     This function does two main things:
     
     1.  Gets all teams via 'epl/v1/teams' endpoint, stores the results in a dataframe.
 
-    2.  Then uploads the raw json from the API call into s3 for storage.
+    2.  Then uploads the raw json from the API call into s3 for storage, under s3_key
+        (raw/json/teams/<season>_teams.json by default) and as Parquet partitioned by
+        season when parquet_prefix is given.
     """
     logger.info("Teams ingestion starting....")
+    teams_df = None
     try:
-        teams_df = api.fetch('epl/v1/teams')
-        if teams_df is not None and not teams_df.empty:
-            s3.s3_upload_raw_json(
-                data=teams_df.to_dict(orient="records"),
-                s3_key='raw/json/teams/2024_teams.json',
-                include_ts=False
+        #decoded with TEAM_API_SCHEMA, the response bytes are uploaded as they came
+        teams_df, pages = api.fetch_with_raw('epl/v1/teams', TEAM_API_SCHEMA)
+        if not teams_df.empty:
+            s3.s3_upload_bytes(
+                raw_document(pages),
+                s3_key=s3_key or teams_s3_key(api.season)
             )
+            if parquet_prefix:
+                s3.s3_upload_parquet(
+                    teams_df.assign(season=api.season),
+                    prefix=parquet_prefix,
+                    partition_cols=["season"]
+                )
             logger.info(f"Fetched and uploaded all team data to s3")
         else:
             logger.warning(f"No teams data returned or DataFrame is empty")
     except Exception as e:
-        logger.warning(f"Error processing teams data") 
+        logger.warning(f"Error processing teams data: {e}")
     
     logger.info("Teams ingestion complete!")
 
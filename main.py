@@ -10,18 +10,23 @@ This script runs an end-to-end ETL pipeline:
 
 
 #utility and wrapper imports
-from utilities.logger import get_logger
-from src.api_ingestor import APIIngestion
-from src.s3_wrapper import S3Wrapper
-from src.postgres_wrapper import PostgresWrapper
+from utilities.logger import get_logger, set_log_context
+from utilities.metrics import metrics
+from clients import env_flag, make_rate_limiter, make_api, make_s3, make_pg
+from src.change_manifest import ChangeManifest
+from src.player_index import PlayerIndex
+from src.run_state import RunState
+from src.dag import DAGRunner, Channel
+from src.json_decoder import read_raw_records
 from clean_players import clean_players
 from clean_teams import clean_teams
-from ingest_players import fetch_and_store_all_players_raw
+from ingest_players import iter_team_players, store_team_players_raw
 from ingest_teams import ingest_teams_and_store_all_teams
 from pg_upload import pg_upload
 
 #library imports
 import os
+import argparse
 import dotenv
 import pandas as pd
 
@@ -30,42 +35,297 @@ logger = get_logger(__name__)
 dotenv.load_dotenv()
 
 
-def main():
+def build_pipeline(api, s3, pg, manifest=None, write_parquet=False, fetch_workers=1, load_workers=1,
+                   load_mode="append", copy_format="csv", batch_rows=5_000, queue_size=8, run_state=None,
+                   player_index=None):
+    """
+    Builds the ETL as a DAG of stages. The teams branch runs first (player fetching
+    needs the team ids), after that the player stages are connected by bounded
+    channels so API fetches, S3 uploads, cleaning and COPY all overlap:
+
+        ingest_teams -> clean_teams -> load_teams ---------------------------.
+                             |                                                v
+                             '-> fetch_players =>  upload_players      load_players -> commit_manifest
+                                               =>  clean_players  =========^
+
+    With a RunState every stage checkpoints its completed partitions (teams, and each
+    team's roster for fetch/upload/load), and a resumed run skips them. Fetched
+    payloads are kept in the run state so resumed runs don't call the API again.
+    Rosters loaded before a resume still pass through the PlayerIndex, so their
+    entries and claims are staged again before the index is committed.
+
+    With a PlayerIndex each roster is resolved against the other rosters and the last
+    load before it is queued: duplicate players (mid-season transfers) and unchanged
+    rows are dropped, departures are deleted by (id, team_id) instead of delete_missing.
+    """
+    runner = DAGRunner()
+    raw_players = Channel("raw_players", queue_size)
+    players_to_clean = Channel("players_to_clean", queue_size)
+    players_to_load = Channel("players_to_load", queue_size)
+
+    def ingest_teams(results):
+        if run_state is not None and run_state.is_done("ingest_teams"):
+            logger.info("Teams already ingested in this run, using checkpoint")
+            return read_raw_records(run_state.load_payload("ingest_teams", "all"))
+
+        teams_df = ingest_teams_and_store_all_teams(
+            api, s3,
+            parquet_prefix='raw/parquet/epl/teams' if write_parquet else None
+            )
+        if run_state is not None and teams_df is not None and not teams_df.empty:
+            run_state.save_payload("ingest_teams", "all", teams_df.to_json(orient="records").encode("utf-8"))
+            run_state.mark_done("ingest_teams")
+        return teams_df
+
+    def clean_teams_stage(results):
+        cleaned_teams = clean_teams(results["ingest_teams"])
+        if write_parquet:
+            s3.s3_upload_parquet(cleaned_teams.assign(season=api.season), 'curated/parquet/epl/teams', ["season"])
+        return cleaned_teams
+
+    def load_teams(results):
+        if run_state is not None and run_state.is_done("load_teams"):
+            logger.info("Teams already loaded in this run, skipping")
+            return True
+        loaded = pg_upload(
+            pg, results["clean_teams"], "epl_datapipeline.epl_teams",
+            workers=load_workers, mode=load_mode, format=copy_format
+            )
+        if run_state is not None and loaded:
+            run_state.mark_done("load_teams")
+        return loaded
+
+    def fetch_players(results):
+        team_ids = results["clean_teams"]["id"].tolist()
+        fetched = 0
+        def publish(item):
+            nonlocal fetched
+            raw_players.put(item)
+            players_to_clean.put(item)
+            fetched += 1
+
+        pending, unchanged = [], set()
+        for team_id in team_ids:
+            checkpoint = run_state.get("fetch_players", team_id) if run_state is not None else None
+            if checkpoint is None:
+                pending.append(team_id)
+            elif not checkpoint.get("unchanged"):
+                raw_json = run_state.load_payload("fetch_players", team_id)
+                publish((team_id, read_raw_records(raw_json), raw_json, checkpoint.get("digest")))
+            else:
+                unchanged.add(team_id)
+        if len(pending) < len(team_ids):
+            logger.info(f"Resuming: {len(team_ids) - len(pending)} teams restored from checkpoints")
+
+        def mark_unchanged(team_id):
+            unchanged.add(team_id)
+            if run_state is not None:
+                run_state.mark_done("fetch_players", team_id, unchanged=True)
+
+        for item in iter_team_players(api, pending, fetch_workers, manifest, on_unchanged=mark_unchanged):
+            team_id, _, raw_json, digest = item
+            if run_state is not None:
+                run_state.save_payload("fetch_players", team_id, raw_json)
+                run_state.mark_done("fetch_players", team_id, digest=digest)
+            publish(item)
+        logger.info(f"Fetched players for {fetched} of {len(team_ids)} teams")
+        #fetched rosters still flow downstream, the failure keeps the run resumable
+        missing = len(team_ids) - fetched - len(unchanged)
+        if missing:
+            raise RuntimeError(f"Player fetch failed for {missing} teams")
+        return fetched
+
+    def upload_players(results):
+        uploaded = 0
+        for team_id, player_df, raw_json, digest in raw_players:
+            if run_state is not None and run_state.is_done("upload_players", team_id):
+                if manifest is not None:
+                    manifest.stage(team_id, digest)
+                continue
+            stored = store_team_players_raw(
+                s3, team_id, raw_json,
+                season=api.season,
+                manifest=manifest,
+                digest=digest,
+                parquet_prefix='raw/parquet/epl/players' if write_parquet else None,
+                player_df=player_df
+                )
+            if run_state is not None and stored:
+                run_state.mark_done("upload_players", team_id)
+            uploaded += stored
+        return uploaded
+
+    def clean_players_stage(results):
+        for team_id, player_df, raw_json, digest in players_to_clean:
+            loaded = run_state is not None and run_state.is_done("load_players", team_id)
+            #the player index still resolves loaded rosters, see load_players
+            if loaded and player_index is None:
+                continue
+            cleaned_players = clean_players(player_df)
+            if cleaned_players is None or cleaned_players.empty:
+                continue
+            if write_parquet and not loaded:
+                s3.s3_upload_parquet(cleaned_players.assign(season=api.season), 'curated/parquet/epl/players', ["season", "team_id"])
+            players_to_load.put((team_id, cleaned_players))
+
+    def load_players(results):
+        #batches hold whole rosters, so upsert's delete scoped by team_id stays correct
+        table = "epl_datapipeline.epl_team_players"
+        success = True
+        batch = {}
+        deletes = []
+        def flush():
+            nonlocal success, batch, deletes
+            loaded = True
+            if deletes:
+                #rows taken over by a later roster may still be waiting in this batch
+                removed = set(deletes)
+                for team_id, df in batch.items():
+                    batch[team_id] = df[[pair not in removed for pair in zip(df["id"], df["team_id"])]]
+                loaded = pg.run_batch(f"DELETE FROM {table} WHERE id = %s AND team_id = %s", deletes)
+            frames = [df for df in batch.values() if not df.empty]
+            if loaded and frames:
+                #in upsert mode players no longer on a loaded roster are removed from that team,
+                #the player index only passes changed rows and reports departures itself
+                loaded = pg_upload(
+                    pg, pd.concat(frames, ignore_index=True), table,
+                    workers=load_workers, mode=load_mode, format=copy_format,
+                    delete_missing=player_index is None, delete_scope="team_id"
+                    )
+            if loaded and run_state is not None:
+                for team_id in batch:
+                    run_state.mark_done("load_players", team_id)
+            success &= loaded
+            batch = {}
+            deletes = []
+        for team_id, cleaned_players in players_to_load:
+            if player_index is not None:
+                cleaned_players, removed = player_index.resolve(team_id, cleaned_players)
+                if run_state is not None and run_state.is_done("load_players", team_id):
+                    #loaded before a resume, resolved again only to restage its index entries and claims
+                    continue
+                deletes.extend(removed)
+            batch[team_id] = cleaned_players
+            if sum(len(df) for df in batch.values()) >= batch_rows:
+                flush()
+        flush()
+        if player_index is not None:
+            logger.info(f"Player index: {player_index.unchanged} unchanged and {player_index.duplicates} duplicate players skipped")
+        if not success:
+            #loaded batches are checkpointed, fail the stage so the run can be resumed
+            raise RuntimeError("Some player batches failed to load")
+        return success
+
+    def commit_manifest(results):
+        if manifest is not None and results["load_players"]:
+            manifest.commit()
+        if player_index is not None and results["load_players"]:
+            player_index.commit()
+
+    (runner
+        .add_stage("ingest_teams", ingest_teams)
+        .add_stage("clean_teams", clean_teams_stage, deps=["ingest_teams"])
+        .add_stage("load_teams", load_teams, deps=["clean_teams"])
+        .add_stage("fetch_players", fetch_players, deps=["clean_teams"], outputs=[raw_players, players_to_clean])
+        .add_stage("upload_players", upload_players, inputs=[raw_players])
+        .add_stage("clean_players", clean_players_stage, inputs=[players_to_clean], outputs=[players_to_load])
+        #load_teams shares the primary Postgres connection, so player loads start after it
+        .add_stage("load_players", load_players, deps=["load_teams"], inputs=[players_to_load])
+        .add_stage("commit_manifest", commit_manifest, deps=["upload_players", "clean_players", "load_players"]))
+    return runner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the EPL ETL pipeline")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None, metavar="RUN_ID",
+                        help="resume an interrupted run (the latest incomplete one by default)")
+    args = parser.parse_args(argv)
+
+    # Checkpoints of this run, completed stages/teams are skipped when resuming
+    state_dir = os.getenv('RUN_STATE_DIR', '.run_state')
+    run_state = None
+    if args.resume == "latest":
+        run_state = RunState.latest(state_dir)
+        if run_state is None:
+            logger.info("No interrupted run to resume, starting a new one")
+    elif args.resume:
+        run_state = RunState(state_dir, args.resume)
+    if run_state is None:
+        run_state = RunState(state_dir)
+    elif run_state.completed:
+        logger.error(f"Run {run_state.run_id} already completed, nothing to resume")
+        return 1
+    set_log_context(run_id=run_state.run_id)
+
+    # Incremental runs and the player index only pass changed rosters/rows,
+    # append would COPY them next to their old rows
+    load_mode = os.getenv('PG_LOAD_MODE', 'append')
+    for flag in ('INCREMENTAL', 'PLAYER_INDEX'):
+        if env_flag(flag) and load_mode != 'upsert':
+            logger.error(f"{flag}=1 requires PG_LOAD_MODE=upsert")
+            return 1
+
     # Instantiate wrappers (api, s3, pg)
-    api = APIIngestion(
-        base_url='https://api.balldontlie.io/',
-        season=2024,
-        headers= {"Authorization": f"Bearer {os.getenv('API_KEY')}"}                                   
-        )
+    rate_limiter = make_rate_limiter()
+    api = make_api(season=2024, rate_limiter=rate_limiter)
+    s3 = make_s3()
+    pg = make_pg()
 
-    s3 = S3Wrapper(
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_KEY'),
-        region=os.getenv('AWS_REGION'),
-        bucket='t1-de-prep')
-    
-    pg = PostgresWrapper(
-        db_name=os.getenv('POSTGRES_DB'),
-        user=os.getenv('POSTGRES_USER'),
-        password=os.getenv('POSTGRES_PASSWORD'),
-        host='localhost',
-        port=5432
-        )
+    # Optional columnar copies of the raw and cleaned frames
+    write_parquet = env_flag('WRITE_PARQUET')
+
+    # Incremental runs only process rosters that changed since the last successful load
+    manifest = None
+    if env_flag('INCREMENTAL'):
+        manifest = ChangeManifest(
+            path=os.getenv('MANIFEST_PATH'),
+            s3=s3,
+            s3_key='raw/json/epl/players/_manifest.json'
+            ).load()
 
-    # Ingest teams
-    teams_df = ingest_teams_and_store_all_teams(api, s3)
-    cleaned_teams = clean_teams(teams_df)
-    pg_upload(pg, cleaned_teams, "epl_datapipeline.epl_teams")
+    # Player id -> (team, row hash) of the last load: dedupes transfers, skips unchanged players
+    player_index = None
+    if env_flag('PLAYER_INDEX'):
+        player_index = PlayerIndex(
+            path=os.getenv('PLAYER_INDEX_PATH'),
+            s3=s3,
+            s3_key='raw/json/epl/players/_player_index.json'
+            ).load()
 
-    # Ingest players
-    team_ids = cleaned_teams["id"].tolist()
-    players_df = fetch_and_store_all_players_raw(api, s3, team_ids)
-    cleaned_players = clean_players(players_df)
-    pg_upload(pg, cleaned_players, "epl_datapipeline.epl_team_players")
+    runner = build_pipeline(
+        api, s3, pg,
+        manifest=manifest,
+        write_parquet=write_parquet,
+        fetch_workers=int(os.getenv('API_MAX_WORKERS', rate_limiter.max_in_flight)),
+        load_workers=int(os.getenv('PG_LOAD_WORKERS', 1)),
+        load_mode=load_mode,
+        copy_format=os.getenv('PG_COPY_FORMAT', 'csv'),
+        batch_rows=int(os.getenv('PG_BATCH_ROWS', 5_000)),
+        queue_size=int(os.getenv('PIPELINE_QUEUE_SIZE', 8)),
+        run_state=run_state,
+        player_index=player_index
+        )
+    runner.run()
 
-    # Close connection
+    # Close connections
+    api.close()
     pg.close()
+
+    # Per-operation latency / rows / bytes for the run (see utilities/metrics.py)
+    for stage, seconds in runner.timings.items():
+        metrics.record(f"stage.{stage}", seconds, error=stage in runner.failed)
+    if os.getenv('METRICS_JSON_PATH'):
+        metrics.write_json(os.getenv('METRICS_JSON_PATH'), run_id=run_state.run_id, failed=list(runner.failed))
+    if os.getenv('METRICS_PROM_PATH'):
+        metrics.write_prometheus(os.getenv('METRICS_PROM_PATH'))
+
+    if runner.failed:
+        logger.error(f"ETL pipeline finished with failed stages: {list(runner.failed)}")
+        logger.error(f"Resume with: python main.py --resume {run_state.run_id}")
+        return 1
+    run_state.mark_complete()
     logger.info("ETL pipeline completed successfully!")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
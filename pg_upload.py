@@ -1,15 +1,31 @@
 from utilities.logger import get_logger
-from src.postgres_wrapper import PostgresWrapper
 
 logger = get_logger(__name__)
 
-def pg_upload(pg,df,table):
+def pg_upload(pg,df,table,workers=1,batch_rows=50_000,mode="append",
+              key_columns=("id",),delete_missing=False,delete_scope=None,format="csv"):
+    """
+    Loads a cleaned DataFrame with COPY.
+
+    mode="append": COPY straight into the table. With workers > 1 the frame is split
+                   into batches loaded concurrently over the wrapper's connection pool.
+    mode="upsert": COPY into a staging table and merge on key_columns in one
+                   transaction, so reruns don't duplicate rows (see upsert_from_df).
+    format:        "csv" or "binary" COPY encoding, both streamed in fixed-size chunks.
+    """
     try:
         if df is None or df.empty:
             logger.warning("Input DataFrame is empty or None. Skipping upload.")
             return False
         
-        success = pg.copy_from_df(df,table)
+        if mode == "upsert":
+            success = pg.upsert_from_df(
+                df,table,key_columns=key_columns,delete_missing=delete_missing,delete_scope=delete_scope,format=format
+                )
+        elif workers > 1 and len(df) > batch_rows:
+            success = pg.copy_from_df_parallel(df,table,batch_rows=batch_rows,workers=workers,format=format)
+        else:
+            success = pg.copy_from_df(df,table,format=format)
 
         if success:
             logger.info(f"Data successfully uploaded to: {table}")
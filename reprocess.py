@@ -0,0 +1,108 @@
+"""
+reprocess.py
+
+Rebuilds the Postgres tables from raw JSON already stored in S3, without calling the API:
+- Lists the raw prefix for each dataset (paginated)
+- Downloads objects concurrently straight into memory
+- Streams them through clean_teams / clean_players into PostgreSQL
+
+Example:
+    python reprocess.py --dataset players --truncate
+"""
+
+#utility and wrapper imports
+from utilities.logger import get_logger
+from clients import make_s3, make_pg
+from src.json_decoder import read_raw_records
+from clean_players import clean_players
+from clean_teams import clean_teams
+from pg_upload import pg_upload
+
+#library imports
+import os
+import argparse
+import dotenv
+import pandas as pd
+
+#setting up logger and loading .env
+logger = get_logger(__name__)
+dotenv.load_dotenv()
+
+DATASETS = {
+    "teams": {
+        "prefix": "raw/json/teams/",
+        "clean": clean_teams,
+        "table": "epl_datapipeline.epl_teams"
+    },
+    "players": {
+        "prefix": "raw/json/epl/players/",
+        "clean": clean_players,
+        "table": "epl_datapipeline.epl_team_players"
+    }
+}
+
+def iter_raw_frames(s3, prefix, max_workers=None, rows_per_batch=50_000):
+    """
+    Generator yielding DataFrames of roughly rows_per_batch rows built from every raw
+    JSON object under prefix. Objects whose name starts with '_' (e.g. the change
+    manifest) are skipped.
+    """
+    keys = s3.list_keys(prefix, suffix=".json")
+    if not keys:
+        logger.warning(f"No raw objects found under: {prefix}")
+        return
+    keys = [key for key in keys if not os.path.basename(key).startswith("_")]
+
+    frames, rows = [], 0
+    for s3_key, body in s3.iter_objects(keys, max_workers=max_workers):
+        try:
+            df = read_raw_records(body)
+        except Exception as e:
+            logger.warning(f"Could not parse raw object {s3_key}: {e}")
+            continue
+        frames.append(df)
+        rows += len(df)
+        if rows >= rows_per_batch:
+            yield pd.concat(frames, ignore_index=True)
+            frames, rows = [], 0
+    if frames:
+        yield pd.concat(frames, ignore_index=True)
+
+def reprocess_dataset(s3, pg, dataset, truncate=False, max_workers=None, rows_per_batch=50_000, load_workers=1, mode="append"):
+    config = DATASETS[dataset]
+    logger.info(f"Reprocessing {dataset} from s3://{s3.bucket}/{config['prefix']}")
+
+    if truncate:
+        pg.run_command(f"TRUNCATE {config['table']}")
+
+    loaded = 0
+    for raw_df in iter_raw_frames(s3, config["prefix"], max_workers, rows_per_batch):
+        cleaned_df = config["clean"](raw_df)
+        if pg_upload(pg, cleaned_df, config["table"], workers=load_workers, mode=mode):
+            loaded += len(cleaned_df)
+
+    logger.info(f"Reprocessing {dataset} complete, {loaded} rows loaded into {config['table']}")
+    return loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild Postgres tables from raw JSON in S3")
+    parser.add_argument("--dataset", choices=[*DATASETS, "all"], default="all")
+    parser.add_argument("--truncate", action="store_true", help="empty the target table before loading")
+    parser.add_argument("--workers", type=int, default=int(os.getenv('S3_MAX_WORKERS', 8)))
+    parser.add_argument("--rows-per-batch", type=int, default=50_000)
+    parser.add_argument("--load-workers", type=int, default=int(os.getenv('PG_LOAD_WORKERS', 1)))
+    parser.add_argument("--mode", choices=["append", "upsert"], default=os.getenv('PG_LOAD_MODE', 'append'))
+    args = parser.parse_args()
+
+    s3 = make_s3(max_workers=args.workers)
+    pg = make_pg(max_connections=max(int(os.getenv('PG_MAX_CONNECTIONS', 1)), args.load_workers + 1))
+
+    datasets = list(DATASETS) if args.dataset == "all" else [args.dataset]
+    with pg:
+        for dataset in datasets:
+            reprocess_dataset(s3, pg, dataset, args.truncate, args.workers, args.rows_per_batch, args.load_workers, args.mode)
+
+    logger.info("Reprocessing completed successfully!")
+
+if __name__ == "__main__":
+    main()
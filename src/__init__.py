@@ -1,5 +1,31 @@
-from .api_ingestor import APIIngestion
-from .qa_checker import DataQualityChecker
-from .data_cleaner import DataCleaner
-from .s3_wrapper import S3Wrapper
-from .postgres_wrapper import PostgresWrapper
\ No newline at end of file
+"""
+Pipeline components. Names are imported on first access (PEP 562), so
+`import src` or `from src.dag import DAGRunner` doesn't drag in pandas, boto3,
+psycopg2 or requests through the other wrappers.
+"""
+import importlib
+
+_EXPORTS = {
+    "APIIngestion": ".api_ingestor",
+    "DataQualityChecker": ".qa_checker",
+    "DataCleaner": ".data_cleaner",
+    "S3Wrapper": ".s3_wrapper",
+    "PostgresWrapper": ".postgres_wrapper",
+    "RateLimiter": ".rate_limiter",
+    "ResponseCache": ".response_cache",
+    "ChangeManifest": ".change_manifest",
+    "DataProfiler": ".profiler",
+    "RunState": ".run_state",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
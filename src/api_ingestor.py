@@ -2,47 +2,271 @@
 - Handles Ingestion from API and normalization of JSON data
 """
 import sys,os
+import time
+import random
 import requests 
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from utilities.logger import get_logger
+from utilities.metrics import timer, timed
+from src.rate_limiter import retry_after_seconds
+from src.json_decoder import loads, extend_columns, columns_to_frame
 import pandas as pd
-import json
 
 logger = get_logger(__name__)
 
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
 class APIIngestion:
-    def __init__(self,base_url,season,headers=None):
+    """
+    All ingest functions share one instance, so every request goes through the
+    same pooled keep-alive session and the same rate limiter.
+
+    pool_size:      connections kept open per host (match the number of fetch workers)
+    timeout:        (connect, read) timeout in seconds
+    max_retries:    retries for connection errors, timeouts and 5xx responses
+    backoff_factor: base delay for retries, doubled each attempt with full jitter
+    cache:          optional ResponseCache, fresh entries skip the network and stale
+                    ones are revalidated with If-None-Match / If-Modified-Since
+    offline:        replay mode, every response is served from the cache
+    """
+    def __init__(self,base_url,season,headers=None,rate_limiter=None,max_rate_limit_retries=3,
+                 pool_size=10,timeout=(5,30),max_retries=3,backoff_factor=0.5,cache=None,offline=False):
         self.base_url = base_url.rstrip('/')
         self.season = str(season)
         self.headers = headers
+        self.rate_limiter = rate_limiter
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self.offline = offline
+        if offline and cache is None:
+            raise ValueError("offline mode requires a response cache")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        if headers:
+            self.session.headers.update(headers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.session.close()
     
-    def build_url(self,endpoint, team_id=None):
+    def build_url(self,endpoint, team_id=None, cursor=None, per_page=None):
         if team_id:
-            return (f"{self.base_url}/{endpoint.strip('/')}/{team_id}/players?season={self.season}")
+            url = f"{self.base_url}/{endpoint.strip('/')}/{team_id}/players?season={self.season}"
         else:
-            return f"{self.base_url}/{endpoint.strip('/')}?season={self.season}"      
+            url = f"{self.base_url}/{endpoint.strip('/')}?season={self.season}"
+        if per_page:
+            url += f"&per_page={per_page}"
+        if cursor:
+            url += f"&cursor={cursor}"
+        return url
         
-    def fetch(self, endpoint,team_id=None):
+    @timed("api.fetch", rows=len)
+    def fetch(self, endpoint,team_id=None,per_page=None):
         """
         Builds full request URL and returns normalized DataFrame from API response.
+        Follows next_cursor until every page has been read.
         Example: endpoint='epl/v1'
         """
         logger.info("API Ingestion started...")
-        url = self.build_url(endpoint,team_id)
-        logger.debug(f"Request URL: {url}")
-        
+
+        df = None
         try:
-            response = requests.get(url, headers = self.headers)
-
-            if response.status_code == 200:
-                logger.info("API Validation Successful!")
-                data = response.json()
-                return pd.json_normalize(data['data'])
-            else:
-                logger.warning(f"Error: {response.status_code}")
-                logger.warning(f"Response Body: {response.text}")
+            records = []
+            for page in self.fetch_pages(endpoint, team_id, per_page=per_page):
+                records.extend(page)
+            logger.info("API Validation Successful!")
+            with timer("api.json_normalize", rows=len(records)):
+                df = pd.json_normalize(records)
         except Exception as e:
-            logger.exception(f"Exception during API ingestion: {e}")
+            logger.exception("Exception during API ingestion: %s", e)
 
         logger.info("API Ingestion Complete!")
-        return None
+        return df
+
+    @timed("api.fetch", rows=lambda result: len(result[0]))
+    def fetch_with_raw(self, endpoint, schema, team_id=None, per_page=None):
+        """
+        Schema-driven fast path: each page is decoded once (orjson when installed)
+        straight into column lists for the fields declared in schema ({field: dtype},
+        dotted names reach into nested objects), skipping json_normalize.
+        Returns (df, pages) where pages are the raw response bytes, ready to be
+        stored without re-serializing (see json_decoder.raw_document).
+        Raises on a failed page.
+        """
+        columns = {field: [] for field in schema}
+        pages, rows = [], 0
+        for payload, body in self._iter_pages(endpoint, team_id, per_page):
+            pages.append(body)
+            records = payload.get('data') or []
+            rows += len(records)
+            with timer("api.decode_columns", rows=len(records)):
+                extend_columns(columns, records)
+        with timer("api.build_frame", rows=rows):
+            df = columns_to_frame(columns, schema)
+        return df, pages
+
+    def fetch_pages(self, endpoint, team_id=None, per_page=None, prefetch=False):
+        """
+        Generator yielding the list of records from each page of an endpoint.
+        Pages are requested lazily by following meta.next_cursor. With prefetch=True
+        the next page is requested in the background while the caller works on the
+        current one. Raises on a failed page so results are never silently truncated.
+        """
+        for payload, _ in self._iter_pages(endpoint, team_id, per_page, prefetch):
+            yield payload.get('data') or []
+
+    def _iter_pages(self, endpoint, team_id=None, per_page=None, prefetch=False):
+        """Generator of (parsed payload, raw response bytes) per page, see fetch_pages."""
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        pending = None
+        try:
+            body = self._get_body(self.build_url(endpoint, team_id, per_page=per_page))
+            seen_cursors = set()
+            while True:
+                with timer("api.decode_json", bytes=len(body)):
+                    payload = loads(body)
+                cursor = (payload.get('meta') or {}).get('next_cursor')
+                if cursor in seen_cursors:
+                    logger.warning("Cursor %s repeated, stopping pagination", cursor)
+                    cursor = None
+                next_url = self.build_url(endpoint, team_id, cursor=cursor, per_page=per_page) if cursor else None
+                if next_url and executor is not None:
+                    pending = executor.submit(self._get_body, next_url)
+
+                yield payload, body
+
+                if next_url is None:
+                    return
+                seen_cursors.add(cursor)
+                if pending is not None:
+                    body, pending = pending.result(), None
+                else:
+                    body = self._get_body(next_url)
+        finally:
+            if executor is not None:
+                if pending is not None:
+                    pending.cancel()
+                executor.shutdown(wait=False)
+
+    def iter_records(self, endpoint, team_id=None, batch_size=1000, per_page=None, prefetch=True):
+        """
+        Streams an endpoint as normalized DataFrames of at most batch_size rows,
+        so large endpoints can be processed with constant memory.
+        """
+        batch = []
+        for page in self.fetch_pages(endpoint, team_id, per_page=per_page, prefetch=prefetch):
+            batch.extend(page)
+            while len(batch) >= batch_size:
+                yield pd.json_normalize(batch[:batch_size])
+                batch = batch[batch_size:]
+        if batch:
+            yield pd.json_normalize(batch)
+
+    def _get_json(self, url):
+        return loads(self._get_body(url))
+
+    def _get_body(self, url):
+        """Raw response bytes for url, served from / revalidated against the cache when set."""
+        logger.debug("Request URL: %s", url)
+        entry = self.cache.get(url) if self.cache is not None else None
+
+        if entry is not None and (self.offline or self.cache.is_fresh(entry)):
+            logger.debug("Serving cached response for: %s", url)
+            return entry["body"].encode("utf-8")
+        if self.offline:
+            raise LookupError(f"No cached response for {url} (offline mode)")
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            logger.debug("Cached response still valid for: %s", url)
+            self.cache.touch(url, entry)
+            return entry["body"].encode("utf-8")
+        if response.status_code != 200:
+            logger.warning("Error: %s", response.status_code)
+            logger.warning("Response Body: %s", response.text)
+            response.raise_for_status()
+
+        body = response.content
+        if self.cache is not None:
+            self.cache.put(
+                url,
+                body.decode("utf-8"),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        return body
+
+    def _backoff(self, attempt):
+        #full jitter so concurrent workers don't retry in lockstep
+        return random.uniform(0, self.backoff_factor * (2 ** attempt))
+
+    def _get(self, url, headers=None):
+        """
+        Sends a GET request on the pooled session through the rate limiter.
+        On a 429 the wait from Retry-After (or backoff) is applied to every worker
+        sharing the limiter and the request is retried. Connection errors, timeouts
+        and 5xx responses are retried with jittered exponential backoff. Every retry
+        goes back through the limiter so it is counted against the API budget.
+        """
+        rate_limit_attempts = 0
+        error_attempts = 0
+        while True:
+            if self.rate_limiter is not None:
+                with timer("api.rate_limit_wait"):
+                    self.rate_limiter.acquire()
+
+            try:
+                with timer("api.request") as timing:
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                    timing.bytes = len(response.content)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if error_attempts >= self.max_retries:
+                    raise
+                wait = self._backoff(error_attempts)
+                error_attempts += 1
+                logger.warning("Request failed (%s), retry %s/%s in %.1fs", e, error_attempts, self.max_retries, wait)
+                with timer("api.backoff_sleep"):
+                    time.sleep(wait)
+                continue
+
+            if response.status_code == 429 and rate_limit_attempts < self.max_rate_limit_retries:
+                wait = retry_after_seconds(response, rate_limit_attempts)
+                rate_limit_attempts += 1
+                if self.rate_limiter is not None:
+                    self.rate_limiter.penalize(wait)
+                else:
+                    logger.warning("Rate limit hit, retrying in %.1fs", wait)
+                    with timer("api.backoff_sleep"):
+                        time.sleep(wait)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and error_attempts < self.max_retries:
+                wait = self._backoff(error_attempts)
+                error_attempts += 1
+                logger.warning("Server error %s, retry %s/%s in %.1fs", response.status_code, error_attempts, self.max_retries, wait)
+                with timer("api.backoff_sleep"):
+                    time.sleep(wait)
+                continue
+
+            return response
 
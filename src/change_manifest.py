@@ -0,0 +1,81 @@
+"""
+- Manifest of per-partition content hashes used to skip unchanged data between runs
+"""
+import os
+import json
+import hashlib
+import threading
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+class ChangeManifest:
+    """
+    Keeps a {partition_key: sha256} map from the last successful run.
+
+    Stored locally when path is given, otherwise as a JSON object in S3 (s3 + s3_key).
+    New hashes are only staged while a run is in progress. Call commit() once the
+    data has been loaded, so a failed load is picked up again on the next run.
+    Staging None removes the key on commit. label names the manifest in log messages.
+    """
+    def __init__(self, path=None, s3=None, s3_key=None, label="change manifest"):
+        if path is None and (s3 is None or s3_key is None):
+            raise ValueError(f"{label} needs a local path or an s3 wrapper and key")
+        self.path = path
+        self.s3 = s3
+        self.s3_key = s3_key
+        self.label = label
+        self.hashes = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(records):
+        """Hashes raw JSON bytes as-is, anything else is serialized with sorted keys first."""
+        if isinstance(records, (bytes, bytearray)):
+            return hashlib.sha256(records).hexdigest()
+        payload = json.dumps(records, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self):
+        try:
+            if self.path is not None:
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self.hashes = json.load(f)
+            else:
+                self.hashes = self.s3.s3_get_json(self.s3_key) or {}
+            logger.info("Loaded %s with %s entries", self.label, len(self.hashes))
+        except Exception as e:
+            logger.warning("Could not load %s, treating everything as changed: %s", self.label, e)
+            self.hashes = {}
+        return self
+
+    def has_changed(self, key, digest):
+        return self.hashes.get(str(key)) != digest
+
+    def stage(self, key, digest):
+        with self.lock:
+            self.pending[str(key)] = digest
+
+    def commit(self):
+        """Merges staged hashes into the manifest and persists it."""
+        with self.lock:
+            if not self.pending:
+                return True
+            hashes = {key: value for key, value in {**self.hashes, **self.pending}.items() if value is not None}
+            try:
+                if self.path is not None:
+                    tmp_path = f"{self.path}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(hashes, f, indent=2, sort_keys=True)
+                    os.replace(tmp_path, self.path)
+                elif not self.s3.s3_upload_raw_json(hashes, self.s3_key):
+                    raise RuntimeError(f"upload to {self.s3_key} failed")
+            except Exception as e:
+                logger.warning("Failed to save %s: %s", self.label, e)
+                return False
+            self.hashes = hashes
+            self.pending = {}
+            logger.info("%s saved with %s entries", self.label.capitalize(), len(hashes))
+            return True
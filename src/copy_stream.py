@@ -0,0 +1,207 @@
+"""
+- Lazy encoders feeding PostgreSQL COPY FROM STDIN in fixed-size chunks (CSV or binary)
+"""
+import struct
+from itertools import chain
+import numpy as np
+import pandas as pd
+from utilities.logger import get_logger
+from utilities.metrics import timer
+
+logger = get_logger(__name__)
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+NULL_FIELD = struct.pack(">i", -1)
+
+PG_EPOCH_NP = np.datetime64("2000-01-01")
+
+FIXED_WIDTH_TYPES = {
+    "int2": ">i2",
+    "int4": ">i4",
+    "int8": ">i8",
+    "float4": ">f4",
+    "float8": ">f8",
+}
+STRUCT_FORMATS = {">i2": "h", ">i4": "i", ">i8": "q", ">f4": "f", ">f8": "d"}
+TEXT_TYPES = {"text", "varchar", "bpchar", "name", "citext"}
+
+
+class CopyStream:
+    """
+    Read-only file-like object over an iterator of byte chunks, so copy_expert can pull
+    data as it needs it instead of receiving one fully rendered buffer.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.current = b""
+        self.position = 0
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self.current[self.position:] + b"".join(self.chunks)
+            self.current, self.position = b"", 0
+            self.bytes_read += len(data)
+            return data
+
+        parts = []
+        remaining = size
+        while remaining > 0:
+            if self.position >= len(self.current):
+                self.current = next(self.chunks, None)
+                self.position = 0
+                if self.current is None:
+                    self.current = b""
+                    break
+                continue
+            part = self.current[self.position:self.position + remaining]
+            self.position += len(part)
+            remaining -= len(part)
+            parts.append(part)
+
+        data = b"".join(parts)
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self, size=-1):
+        #copy_expert only calls read(), readline is here to satisfy file-like checks
+        return self.read(size)
+
+
+def iter_frames(data, chunk_rows):
+    """Splits a DataFrame, or every DataFrame from an iterator, into chunk_rows slices."""
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    for df in frames:
+        if df is None or df.empty:
+            continue
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(frames):
+    for df in frames:
+        with timer("pg.encode_csv", rows=len(df)) as timing:
+            chunk = df.to_csv(header=False, index=False).encode("utf-8")
+            timing.bytes = len(chunk)
+        yield chunk
+
+
+def _check_fixed_width(series, pg_type):
+    """
+    Rejects values the target type can't hold, numpy would otherwise wrap them or drop
+    the fraction and COPY would load a different number without complaint.
+    """
+    target = np.dtype(FIXED_WIDTH_TYPES[pg_type])
+    values = series.dropna()
+    if values.empty:
+        return
+    try:
+        values = pd.to_numeric(values).to_numpy()
+    except (TypeError, ValueError):
+        raise ValueError(f"Binary COPY column '{series.name}' ({pg_type}) holds non-numeric values") from None
+
+    if target.kind == "f":
+        finite = values[np.isfinite(values)].astype("float64")
+        if len(finite) and np.abs(finite).max() > np.finfo(target).max:
+            raise ValueError(f"Binary COPY column '{series.name}' has values out of range for {pg_type}")
+        return
+    if values.dtype.kind == "f" and (~np.isfinite(values) | (values != np.floor(values))).any():
+        raise ValueError(f"Binary COPY column '{series.name}' has non-integer values for {pg_type}")
+    bounds = np.iinfo(target)
+    #object dtype here means integers too wide for int64/uint64
+    if values.dtype.kind == "O" or values.min() < bounds.min or values.max() > bounds.max:
+        raise ValueError(f"Binary COPY column '{series.name}' has values out of range for {pg_type}")
+
+
+def _fixed_width_fields(series, pg_type):
+    """Encodes a numeric column as [length][value] fields, vectorized when there are no nulls."""
+    _check_fixed_width(series, pg_type)
+    dtype = FIXED_WIDTH_TYPES[pg_type]
+    nulls = series.isna().to_numpy()
+    width = np.dtype(dtype).itemsize
+    if not nulls.any():
+        packed = np.empty(len(series), dtype=[("length", ">i4"), ("value", dtype)])
+        packed["length"] = width
+        packed["value"] = series.to_numpy()
+        raw = packed.tobytes()
+        step = width + 4
+        return [raw[i:i + step] for i in range(0, len(raw), step)]
+
+    fmt = ">i" + STRUCT_FORMATS[dtype]
+    cast = float if dtype.startswith(">f") else int
+    return [NULL_FIELD if null else struct.pack(fmt, width, cast(value)) for value, null in zip(series.tolist(), nulls)]
+
+
+def _text_fields(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        #match the CSV rendering: plain dates when there is no time component
+        values = series.dropna()
+        date_only = (values == values.dt.normalize()).all()
+        series = series.dt.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S")
+    fields = []
+    for value in series.tolist():
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA or value is pd.NaT:
+            fields.append(NULL_FIELD)
+        else:
+            encoded = str(value).encode("utf-8")
+            fields.append(struct.pack(">i", len(encoded)) + encoded)
+    return fields
+
+
+def _bool_fields(series):
+    return [
+        NULL_FIELD if pd.isna(value) else struct.pack(">ib", 1, bool(value))
+        for value in series.tolist()
+    ]
+
+
+def _date_fields(series):
+    dates = pd.to_datetime(series, errors="coerce").to_numpy(dtype="datetime64[D]")
+    days = (dates - PG_EPOCH_NP).astype("int64")
+    nulls = np.isnat(dates)
+    return [NULL_FIELD if null else struct.pack(">ii", 4, day) for day, null in zip(days.tolist(), nulls)]
+
+
+def _timestamp_fields(series):
+    stamps = pd.to_datetime(series, errors="coerce")
+    if getattr(stamps.dt, "tz", None) is not None:
+        stamps = stamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    values = stamps.to_numpy(dtype="datetime64[us]")
+    micros = (values - PG_EPOCH_NP).astype("int64")
+    nulls = np.isnat(values)
+    return [NULL_FIELD if null else struct.pack(">iq", 8, value) for value, null in zip(micros.tolist(), nulls)]
+
+
+def encode_binary_column(series, pg_type):
+    if pg_type in FIXED_WIDTH_TYPES:
+        return _fixed_width_fields(series, pg_type)
+    if pg_type in TEXT_TYPES:
+        return _text_fields(series)
+    if pg_type == "bool":
+        return _bool_fields(series)
+    if pg_type == "date":
+        return _date_fields(series)
+    if pg_type in ("timestamp", "timestamptz"):
+        return _timestamp_fields(series)
+    raise ValueError(f"Binary COPY does not support column type '{pg_type}', use format='csv'")
+
+
+def iter_binary_chunks(frames, column_types):
+    """
+    Encodes DataFrame chunks in PostgreSQL's binary COPY format.
+    column_types maps each DataFrame column to the target column's type name (pg_type.typname),
+    values are written in that exact wire type so the server does no text parsing.
+    """
+    yield PGCOPY_HEADER
+    for df in frames:
+        with timer("pg.encode_binary", rows=len(df)) as timing:
+            row_header = struct.pack(">h", len(df.columns))
+            columns = [encode_binary_column(df[col], column_types[col]) for col in df.columns]
+            chunk = b"".join(chain.from_iterable((row_header, *row) for row in zip(*columns)))
+            timing.bytes = len(chunk)
+        yield chunk
+    yield PGCOPY_TRAILER
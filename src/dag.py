@@ -0,0 +1,171 @@
+"""
+- Small thread-based DAG runner with bounded channels between streaming stages
+"""
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utilities.logger import get_logger, log_context
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+class ChannelCancelled(Exception):
+    """Raised in a producer when the consumer of its channel has failed."""
+
+
+class Channel:
+    """
+    Bounded queue between two stages. The producer put()s items and blocks when the
+    consumer falls behind (back-pressure); iterating the channel yields items until
+    the producer side is closed. The runner closes a stage's outputs when it finishes
+    and cancels its inputs when it fails, so neither side can hang on the other.
+    """
+    def __init__(self, name, maxsize=8):
+        self.name = name
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+        self.cancelled = False
+
+    def put(self, item):
+        while True:
+            if self.cancelled:
+                raise ChannelCancelled(f"Channel '{self.name}' was cancelled by its consumer")
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        while not self.cancelled:
+            try:
+                self.queue.put(_DONE, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def cancel(self):
+        self.cancelled = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+
+class Stage:
+    def __init__(self, name, func, deps=(), inputs=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+
+class DAGRunner:
+    """
+    Runs stages on a thread pool as soon as the stages they depend on have finished.
+
+    func(results) receives a dict with the return values of its deps. Stages connected
+    only through Channels (inputs/outputs) run at the same time, so e.g. fetching,
+    uploading, cleaning and loading overlap in a pipeline. A failed stage skips every
+    stage depending on it; run() returns the results of the stages that succeeded
+    and leaves the failures in self.failed.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.stages = {}
+        self.failed = {}
+        self.timings = {}
+
+    def add_stage(self, name, func, deps=(), inputs=(), outputs=()):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists")
+        self.stages[name] = Stage(name, func, deps, inputs, outputs)
+        return self
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        visiting, done = set(), set()
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+        for name in self.stages:
+            visit(name)
+
+    def _run_stage(self, stage, results):
+        start = time.perf_counter()
+        #records logged while the stage runs carry its name (see utilities/logger.py)
+        with log_context(stage=stage.name):
+            logger.info("Stage '%s' started", stage.name)
+            try:
+                return stage.func({dep: results[dep] for dep in stage.deps})
+            finally:
+                self.timings[stage.name] = time.perf_counter() - start
+                for channel in stage.outputs:
+                    channel.close()
+
+    def _finish_unrun(self, stage):
+        #a stage that never runs must still release the channels it is attached to
+        for channel in stage.outputs:
+            channel.close()
+        for channel in stage.inputs:
+            channel.cancel()
+
+    def run(self):
+        self._validate()
+        results = {}
+        self.failed = {}
+        pending = dict(self.stages)
+        running = {}
+        #every stage may block on a channel, so by default each one gets its own thread
+        workers = self.max_workers or len(self.stages)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if any(dep in self.failed for dep in stage.deps):
+                        self.failed[name] = "skipped: upstream stage failed"
+                        logger.warning("Stage '%s' skipped, an upstream stage failed", name)
+                        self._finish_unrun(stage)
+                        del pending[name]
+                    elif all(dep in results for dep in stage.deps):
+                        running[executor.submit(self._run_stage, stage, results)] = stage
+                        del pending[name]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        results[stage.name] = future.result()
+                        logger.info("Stage '%s' finished in %.2fs", stage.name, self.timings[stage.name])
+                    except Exception as e:
+                        self.failed[stage.name] = e
+                        logger.exception("Stage '%s' failed: %s", stage.name, e)
+                        for channel in stage.inputs:
+                            channel.cancel()
+
+        return results
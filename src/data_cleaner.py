@@ -1,73 +1,251 @@
 #boiler plate code needed for the logger to work
 import sys,os
+import logging
 from utilities.logger import get_logger
+from utilities.metrics import timer
 logger = get_logger(__name__)
 
 import pandas as pd
 import datetime as dt
 from datetime import date
+from src.schemas import DATE_FORMAT
+
+#steps that need every column (or change column names), projections can't move past them
+BARRIER_STEPS = {"drop_nulls", "lower_columns", "rename_columns", "drop_columns"}
+#steps that only touch the column(s) named in their arguments
+COLUMN_STEPS = {"cast_column_types", "apply_schema", "date_string_conversion", "datetime_conversion", "clean_age_column"}
+#steps that can turn values into nulls, a fill_nulls after them is never redundant
+NULL_PRODUCING_STEPS = {"apply_schema", "date_string_conversion", "datetime_conversion", "clean_age_column"}
+
+def parse_age_days(series):
+    """
+    Vectorized parser for ages like '31 years 348 days' -> 31 * 365 + 348.
+    Unparseable values become <NA>.
+    """
+    parts = series.astype("string").str.split(" ", n=3, expand=True).reindex(columns=range(4))
+    years = pd.to_numeric(parts[0], errors="coerce")
+    days = pd.to_numeric(parts[2], errors="coerce")
+    return (years * 365 + days).astype("Int16")
+
+def parse_dates(series, date_format=DATE_FORMAT):
+    """Parses date strings with a fixed format (no per-value format inference)."""
+    return pd.to_datetime(series, format=date_format, errors="coerce")
 
 class DataCleaner:
-    def __init__(self,df):
+    """
+    Chainable cleaning steps.
+
+    By default each step runs immediately. With lazy=True the chained calls only
+    record a plan; get_df() optimizes it and runs it once under copy-on-write:
+      - column projections are pushed before casts/conversions, and steps on
+        columns that are later discarded are dropped
+      - fill_nulls right after drop_nulls (with nothing in between that can
+        create nulls) is removed
+      - consecutive casts are merged into a single astype call
+    """
+    def __init__(self,df,lazy=False):
         self.df = df
+        self.lazy = lazy
+        self.plan = []
 
-    def drop_nulls(self):
-        self.df = self.df.dropna()
+    def _add(self, step, *args):
+        if self.lazy:
+            self.plan.append((step, args))
+        else:
+            self.df = self._run(step, self.df, args)
         return self
 
+    def _run(self, step, df, args):
+        with timer(f"cleaner.{step}", rows=len(df)):
+            return getattr(self, f"_{step}")(df, *args)
+
+    def drop_nulls(self):
+        return self._add("drop_nulls")
+
     def fill_nulls(self):
-        self.df = self.df.fillna('')
-        return self
-    
+        return self._add("fill_nulls")
+
     def drop_columns(self,columns_to_drop=None):
         if columns_to_drop is None:
-            logger.warning(f"No columns specified to drop.")
-        else:
-            self.df = self.df.drop(columns=columns_to_drop)
-        return self
-    
+            logger.warning("No columns specified to drop.")
+            return self
+        return self._add("drop_columns", list(columns_to_drop))
+
+    def select_columns(self,columns):
+        """Keeps only the given columns, in that order."""
+        return self._add("select_columns", list(columns))
+
     def lower_columns(self):
-        self.df.columns = self.df.columns.str.lower()
-        return self
-    
+        return self._add("lower_columns")
+
     def date_string_conversion(self,col):
-        self.df[col] = pd.to_datetime(self.df[col],errors="coerce")
-        self.df[col] = self.df[col].dt.strftime('%Y-%m-%d')
-        return self
-    
+        return self._add("date_string_conversion", col)
+
     def datetime_conversion(self,col):
-        self.df[col] = pd.to_datetime(self.df[col],errors="coerce")
-        return self
-    
+        return self._add("datetime_conversion", col)
+
     def rename_columns(self,rename_map):
         if not isinstance(rename_map, dict):
             logger.warning("rename_columns() expects a dictionary")
             return self.df
-        self.df.rename(columns=rename_map, inplace=True)
-        return self
-    
+        return self._add("rename_columns", rename_map)
+
     def cast_column_types(self, type_map):
         if not isinstance(type_map, dict):
             logger.warning("cast_column_types expectd a dictionary")
             return self.df
+        return self._add("cast_column_types", dict(type_map))
 
-        for col, dtype in type_map.items():
-            if col not in self.df.columns:
-                logger.warning(f"Column '{col}' not found in DataFrame")
+    def clean_age_column(self, col='age'):
+        return self._add("clean_age_column", col)
+
+    def apply_schema(self, schema):
+        """
+        Assigns compact dtypes from a schema (see src/schemas.py): categoricals,
+        narrow integers, fixed-format dates and the age_days parser.
+        """
+        if not isinstance(schema, dict):
+            logger.warning("apply_schema expects a dictionary")
+            return self.df
+        return self._add("apply_schema", dict(schema))
+
+    def get_df(self):
+        if self.lazy and self.plan:
+            plan = self.optimize(self.plan)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Running cleaning plan: %s", [step for step, _ in plan])
+            with pd.option_context("mode.copy_on_write", True):
+                #shallow copy made under CoW, so in-place steps can never write into the caller's frame
+                df = self.df.copy(deep=False)
+                for step, args in plan:
+                    df = self._run(step, df, args)
+            self.df = df
+            self.plan = []
+        return self.df
+
+    @staticmethod
+    def optimize(plan):
+        """Rewrites a recorded plan into an equivalent, cheaper one (see class docstring)."""
+        #backward pass: track which columns are still needed and push projections up
+        needed = None
+        optimized = []
+        for step, args in reversed(plan):
+            if step == "select_columns":
+                #an earlier selection must still see every column it names, so the
+                #later projection stops here and a new one starts from this selection
+                if needed is not None:
+                    optimized.append(("project", (needed,)))
+                needed = set(args[0])
+            elif step in COLUMN_STEPS and needed is not None:
+                if step in ("cast_column_types", "apply_schema"):
+                    type_map = {col: dtype for col, dtype in args[0].items() if col in needed}
+                    if not type_map:
+                        continue
+                    args = (type_map,)
+                elif args[0] not in needed:
+                    continue
+            elif step in BARRIER_STEPS:
+                if needed is not None:
+                    optimized.append(("project", (needed,)))
+                needed = None
+            optimized.append((step, args))
+        if needed is not None:
+            optimized.append(("project", (needed,)))
+        optimized.reverse()
+
+        #forward pass: drop redundant fills and merge adjacent casts
+        result = []
+        null_free = False
+        for step, args in optimized:
+            if step == "drop_nulls":
+                null_free = True
+            elif step in NULL_PRODUCING_STEPS:
+                null_free = False
+            elif step == "fill_nulls":
+                if null_free:
+                    continue
+                null_free = True
+
+            if step == "cast_column_types" and result and result[-1][0] == "cast_column_types":
+                result[-1] = (step, ({**result[-1][1][0], **args[0]},))
                 continue
+            result.append((step, args))
+        return result
+
+    def _drop_nulls(self, df):
+        return df.dropna()
+
+    def _fill_nulls(self, df):
+        return df.fillna('')
+
+    def _drop_columns(self, df, columns_to_drop):
+        return df.drop(columns=columns_to_drop)
+
+    def _select_columns(self, df, columns):
+        return df[columns]
+
+    def _project(self, df, columns):
+        keep = [col for col in df.columns if col in columns]
+        return df if len(keep) == len(df.columns) else df[keep]
+
+    def _lower_columns(self, df):
+        return df.set_axis(df.columns.str.lower(), axis=1)
+
+    def _date_string_conversion(self, df, col):
+        df[col] = pd.to_datetime(df[col],errors="coerce")
+        df[col] = df[col].dt.strftime('%Y-%m-%d')
+        return df
+
+    def _datetime_conversion(self, df, col):
+        df[col] = pd.to_datetime(df[col],errors="coerce")
+        return df
+
+    def _rename_columns(self, df, rename_map):
+        return df.rename(columns=rename_map)
+
+    def _cast_column_types(self, df, type_map):
+        present = {}
+        for col, dtype in type_map.items():
+            if col not in df.columns:
+                logger.warning("Column '%s' not found in DataFrame", col)
+            else:
+                present[col] = dtype
+        if not present:
+            return df
+
+        try:
+            df = df.astype(present)
+            logger.debug("Cast %s columns: %s", len(present), present)
+            return df
+        except Exception:
+            pass
+
+        #one bad column shouldn't block the rest, retry column by column
+        for col, dtype in present.items():
             try:
-                self.df[col] = self.df[col].astype(dtype)
-                logger.info(f"Cast column '{col}' to {dtype}.")
+                df[col] = df[col].astype(dtype)
             except Exception as e:
-                logger.warning(f"Could not cast column '{col}' to {dtype}: {e}")
-        return self
-    
-    def clean_age_column(self, col='age'):
-        if col in self.df.columns:
-            self.df[col] = self.df[col].str.extract(r'(\d+)').astype(float)
+                logger.warning("Could not cast column '%s' to %s: %s", col, dtype, e)
+        return df
+
+    def _apply_schema(self, df, schema):
+        casts = {}
+        for col, dtype in schema.items():
+            if col not in df.columns:
+                logger.warning("Column '%s' not found in DataFrame", col)
+            elif dtype == "date":
+                df[col] = parse_dates(df[col])
+            elif dtype == "age_days":
+                df[col] = parse_age_days(df[col])
+            elif dtype.startswith(("int", "uint")) and df[col].isna().any():
+                casts[col] = dtype.replace("u", "U", 1) if dtype.startswith("u") else dtype.capitalize()
+            else:
+                casts[col] = dtype
+        return self._cast_column_types(df, casts)
+
+    def _clean_age_column(self, df, col):
+        if col in df.columns:
+            df[col] = df[col].str.extract(r'(\d+)', expand=False).astype(float)
         else:
-            logger.warning(f"Column '{col}' not found for age cleaning.")
-        return self
-    
-    def get_df(self):
-        return self.df
\ No newline at end of file
+            logger.warning("Column '%s' not found for age cleaning.", col)
+        return df
@@ -0,0 +1,83 @@
+"""
+- Schema-driven JSON decoding: response bytes -> column lists -> DataFrame (no json_normalize)
+
+Raw documents keep the API pages byte for byte, wrapped without re-serializing them:
+    {"team_id": 1, "pages": [<page 1 bytes>, <page 2 bytes>, ...]}
+records_from_raw() / read_raw_records() read both that format and the older plain list of records.
+"""
+import json
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(body):
+    """Parses JSON bytes with orjson when it is installed, the json module otherwise."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def _getter(field):
+    if "." not in field:
+        return lambda record: record.get(field)
+    path = field.split(".")
+    def get(record):
+        for key in path:
+            if not isinstance(record, dict):
+                return None
+            record = record.get(key)
+        return record
+    return get
+
+def extend_columns(columns, records):
+    """Appends the declared fields of records to columns ({field: list}), one pass per field."""
+    for field, values in columns.items():
+        if "." in field:
+            get = _getter(field)
+            values.extend(get(record) for record in records)
+        else:
+            values.extend(record.get(field) for record in records)
+    return columns
+
+def columns_to_frame(columns, schema):
+    """
+    Builds a DataFrame from column lists using the schema's dtypes ({field: dtype}, None
+    to infer). Integer fields with nulls become nullable integers; a value that doesn't
+    fit the declared dtype leaves that column as objects for the cleaning step to handle.
+    """
+    data = {}
+    for field, values in columns.items():
+        dtype = schema.get(field)
+        if dtype is None:
+            data[field] = pd.Series(values)
+            continue
+        try:
+            if dtype.startswith("int") and any(value is None for value in values):
+                data[field] = pd.Series(pd.array(values, dtype=dtype.capitalize()))
+            else:
+                data[field] = pd.Series(values, dtype=dtype)
+        except (TypeError, ValueError, OverflowError):
+            data[field] = pd.Series(values, dtype=object)
+    return pd.DataFrame(data)
+
+def raw_document(pages, **fields):
+    """Wraps raw page bytes (and e.g. team_id) into one JSON document, pages are not re-encoded."""
+    head = b"".join(b'"%s":%s,' % (key.encode("utf-8"), json.dumps(value).encode("utf-8")) for key, value in fields.items())
+    return b'{' + head + b'"pages":[' + b",".join(pages) + b']}'
+
+def records_from_raw(body):
+    """List of records from a raw document (or from a plain JSON list of records)."""
+    document = loads(body)
+    if isinstance(document, list):
+        return document
+    extra = {key: value for key, value in document.items() if key != "pages"}
+    records = [record for page in document.get("pages", []) for record in (page.get("data") or [])]
+    if extra:
+        records = [{**record, **extra} for record in records]
+    return records
+
+def read_raw_records(body):
+    """Parses a raw JSON object (page document or plain list of records) into a DataFrame."""
+    return pd.DataFrame.from_records(records_from_raw(body))
@@ -0,0 +1,110 @@
+"""
+- Persistent player id -> (team_id, row hash) index used to dedupe rosters across teams
+"""
+import pandas as pd
+from src.change_manifest import ChangeManifest
+from src.profiler import hash_values
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PlayerIndex(ChangeManifest):
+    """
+    Keeps {player_id: [team_id, row_hash(, contested_team_id)]} from the last successful
+    load, stored the same way as the ChangeManifest (local JSON file or S3 object) and
+    loaded once per run.
+
+    resolve() takes one cleaned roster at a time as rosters stream in and, with an
+    O(1) dict lookup per player:
+      - keeps one row per player when several rosters list them (the per-team endpoint
+        lists mid-season transfers under both clubs). A new team taking a player from
+        the indexed team wins, that's where the player moved to; otherwise the first
+        roster seen keeps the player. The losing team is stored with the entry, so the
+        same pair of rosters resolves the same way on every later run
+      - drops players whose team and row hash are unchanged since the last load
+      - returns the (player_id, team_id) rows to delete: players who left the roster
+        or were taken over by another team
+    Entries are staged; commit() persists them once the load succeeded.
+    """
+    def __init__(self, path=None, s3=None, s3_key=None, key_column="id", team_column="team_id"):
+        super().__init__(path=path, s3=s3, s3_key=s3_key, label="player index")
+        self.key_column = key_column
+        self.team_column = team_column
+        self.claimed = {}
+        self.deferred = {}
+        self.seen_teams = set()
+        self.rosters = {}
+        self.unchanged = 0
+        self.duplicates = 0
+
+    def load(self):
+        super().load()
+        #team_id -> player keys of the last load, to find who left a roster
+        self.rosters = {}
+        for key, entry in self.hashes.items():
+            self.rosters.setdefault(entry[0], set()).add(key)
+        return self
+
+    def row_hashes(self, df):
+        """One 64-bit hash per row over everything but the team column."""
+        return hash_values(df.drop(columns=[self.team_column], errors="ignore")).tolist()
+
+    def _set_contested(self, key, team_id):
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is not None:
+                self.pending[key] = [*entry[:2], team_id]
+
+    def resolve(self, team_id, df):
+        """Returns (rows to load, [(player_id, team_id) to delete]) for one team's cleaned roster."""
+        team_id = int(team_id)
+        self.seen_teams.add(team_id)
+        keep, released, removed, staged = [], [], [], {}
+        player_ids = df[self.key_column].tolist()
+
+        for position, (player_id, digest) in enumerate(zip(player_ids, self.row_hashes(df))):
+            key = str(player_id)
+            previous = self.hashes.get(key)
+            indexed_team = previous[0] if previous else None
+            contested = previous[2] if previous and len(previous) > 2 else None
+            claimed = self.claimed.get(key)
+
+            if claimed is None and team_id == contested and indexed_team not in self.seen_teams:
+                #lost this player to the indexed team before, wait for that roster to decide
+                self.deferred[key] = (df.iloc[[position]], digest)
+                continue
+            if claimed is not None and claimed != team_id:
+                if claimed != indexed_team or team_id == contested:
+                    self.duplicates += 1
+                    self._set_contested(key, team_id)
+                    continue
+                #a new team took the player from the indexed one
+                contested = claimed
+            elif self.deferred.pop(key, None) is not None:
+                self.duplicates += 1
+
+            self.claimed[key] = team_id
+            if previous and indexed_team != team_id:
+                removed.append((int(player_id), indexed_team))  #moved, drop the old team's row
+            staged[key] = [team_id, digest] if contested is None else [team_id, digest, contested]
+            if previous is not None and previous[:2] == [team_id, digest]:
+                self.unchanged += 1
+                continue
+            keep.append(position)
+
+        for key in self.rosters.get(team_id, set()) - set(map(str, player_ids)):
+            removed.append((int(key), team_id))
+            if key in self.deferred:
+                #the indexed team dropped the player, the roster that was waiting gets them
+                row, digest = self.deferred.pop(key)
+                row_team = int(row[self.team_column].iloc[0])
+                self.claimed[key] = row_team
+                staged[key] = [row_team, digest]
+                released.append(row)
+            elif key not in self.claimed:
+                staged[key] = None  #left the league (or the endpoint), dropped on commit
+
+        with self.lock:
+            self.pending.update(staged)
+        logger.debug("Team %s: %s of %s players changed, %s to delete", team_id, len(keep), len(df), len(removed))
+        return pd.concat([df.iloc[keep], *released]), removed
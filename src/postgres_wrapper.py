@@ -1,25 +1,90 @@
 import sys,os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from utilities.logger import get_logger
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from io import StringIO
+from utilities.metrics import timer
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor, execute_batch, execute_values
+from itertools import chain, count
+import pandas as pd
+from src.copy_stream import CopyStream, iter_frames, iter_csv_chunks, iter_binary_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 logger = get_logger(__name__)
 
+#named (server-side) cursors must be unique per connection
+_cursor_ids = count()
+
 class PostgresWrapper:
-    def __init__(self,db_name,user,password,host='localhost',port=5432):
+    """
+    Wraps a thread-safe connection pool. self.conn / self.cursor are a primary
+    connection used by the single-connection helpers (run_query, copy_from_df, ...);
+    the parallel loaders borrow extra connections through connection().
+
+    min_connections / max_connections: pool bounds, max_connections includes the primary
+    connection, so parallel loads get at most max_connections - 1 workers.
+    """
+    def __init__(self,db_name,user,password,host='localhost',port=5432,min_connections=1,max_connections=1):
+        self.max_connections = max(1, max_connections)
+        self.slots = None
         try:
-            self.conn = psycopg2.connect(
+            self.pool = ThreadedConnectionPool(
+                    min(min_connections, self.max_connections),
+                    self.max_connections,
                     dbname=db_name,
                     user=user,
                     password=password,
                     host=host,
                     port=port
             )
+            #psycopg2 pools raise when exhausted, the semaphore makes borrowers wait instead
+            self.slots = threading.BoundedSemaphore(self.max_connections - 1) if self.max_connections > 1 else None
+            self.conn = self.pool.getconn()
             self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             logger.info("Connection to PostgreSQL succesful!")
         except Exception as e:
-            logger.warning(f"Failed to connect to PostgreSQL: {e}")
+            logger.warning("Failed to connect to PostgreSQL: %s", e)
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a health-checked connection from the pool for the duration of the block.
+        Commits when the block succeeds, rolls back when it raises.
+        """
+        if self.slots is None:
+            raise RuntimeError("connection() needs max_connections > 1")
+        with self.slots:
+            conn = self.pool.getconn()
+            if not self._is_healthy(conn):
+                logger.warning("Discarding broken pooled connection")
+                self.pool.putconn(conn, close=True)
+                conn = self.pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self.pool.putconn(conn)
 
     def __enter__(self):
         return self
@@ -34,7 +99,7 @@ class PostgresWrapper:
             logger.info("Query successfully completed!")
             return self.cursor.fetchall()
         except Exception as e:
-            logger.error(f"Query failed: {e}")
+            logger.error("Query failed: %s", e)
             return None
 
     def run_command(self,command,params=None):
@@ -45,61 +110,445 @@ class PostgresWrapper:
             logger.info("Comand executed and commited!")
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Command failed and rolled back: {e}")
+            logger.error("Command failed and rolled back: %s", e)
+
+    @contextmanager
+    def _read_connection(self):
+        #a pooled connection when there is one, so commits on the primary connection
+        #(e.g. run_command while iterating) don't close the server-side cursor
+        if self.slots is None:
+            try:
+                yield self.conn
+            finally:
+                self.conn.rollback()
+        else:
+            with self.connection() as conn:
+                yield conn
+
+    def _fetch_frames(self,cursor,chunk_rows):
+        columns = None
+        while True:
+            with timer("pg.fetch") as timing:
+                rows = cursor.fetchmany(chunk_rows)
+                timing.rows = len(rows)
+            if not rows:
+                return
+            columns = columns or [column.name for column in cursor.description]
+            yield pd.DataFrame.from_records(rows,columns=columns)
+
+    def iter_query(self,query,params=None,chunk_rows=50_000):
+        """
+        Streams the result of a SELECT as DataFrames of up to chunk_rows rows through a
+        named (server-side) cursor, so only one chunk is held in memory whatever the
+        result size. Yields nothing for an empty result; errors are raised, not logged.
+            for chunk in pg.iter_query("SELECT * FROM epl_team_players"):
+                profiler.update(chunk)
+        """
+        with self._read_connection() as conn:
+            with conn.cursor(name=f"iter_query_{next(_cursor_ids)}") as cursor:
+                cursor.itersize = chunk_rows
+                cursor.execute(query,params)
+                yield from self._fetch_frames(cursor,chunk_rows)
+
+    def run_batch(self,command,params_list,page_size=1000):
+        """
+        Runs one parameterized statement (INSERT, UPDATE, DELETE, ...) for every params
+        tuple in params_list, page_size statements per round trip (execute_batch) and
+        all of them in a single transaction. Returns True when everything was committed.
+        """
+        try:
+            params_list = list(params_list)
+            with timer("pg.run_batch",rows=len(params_list)), self.conn.cursor() as cursor:
+                execute_batch(cursor,command,params_list,page_size=page_size)
+            self.conn.commit()
+            logger.info("Batch of %s statements executed and commited", len(params_list))
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            logger.error("Batch failed and rolled back: %s", e)
+            return False
+
+    def run_values(self,command,rows,template=None,page_size=1000):
+        """
+        Multi-row VALUES variant of run_batch for INSERT ... VALUES %s (optionally
+        ON CONFLICT ...): page_size rows are sent as one statement (execute_values),
+        all pages in a single transaction. Returns True when everything was committed.
+        """
+        try:
+            rows = list(rows)
+            with timer("pg.run_values",rows=len(rows)), self.conn.cursor() as cursor:
+                execute_values(cursor,command,rows,template=template,page_size=page_size)
+            self.conn.commit()
+            logger.info("%s rows written and commited", len(rows))
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            logger.error("Batch failed and rolled back: %s", e)
+            return False
 
     def copy_from_csv(self,file_path,table_name):
         try:
             with open(file_path,'r') as f:
                 self.cursor.copy_expert(f"COPY {table_name} FROM STDIN WITH CSV HEADER",f) 
             self.conn.commit()
-            logger.info(f"CSV Table loaded into table: {table_name}")
+            logger.info("CSV Table loaded into table: %s", table_name)
         except Exception as e:
             self.conn.rollback()
-            logger.warning(f"CSV load failed: {e}")
+            logger.warning("CSV load failed: %s", e)
 
     def export_to_csv(self,file_path,table_name):
         try:
             with open(file_path,'w') as f:
                 self.cursor.copy_expert(f"COPY {table_name} TO STDOUT WITH CSV HEADER",f) 
-            logger.info(f"CSV exported to file path: {file_path}")
+            logger.info("CSV exported to file path: %s", file_path)
+        except Exception as e:
+            logger.warning("CSV export failed: %s", e)
+
+    def export_to_s3(self,table,s3,s3_key,format="csv",content_encoding="gzip",key_column=None,
+                     partitions=1,batch_rows=100_000,workers=None):
+        """
+        Streams a table straight into S3 multipart uploads, no local file involved.
+
+        format="csv":     COPY (...) TO STDOUT WITH CSV HEADER piped into the upload and
+                          compressed on the fly with content_encoding ("gzip", "zstd" or "")
+        format="parquet": rows read through a named (server-side) cursor batch_rows at a
+                          time, every batch written as one Parquet row group (needs pyarrow)
+        key_column / partitions: split the table into that many ranges of an integer key and
+                          export them in parallel over pooled connections (max_connections > 1).
+                          s3_key is then a prefix and each range goes to <s3_key>/part-<n>.<ext>
+        Returns the list of keys written, or None on failure.
+        """
+        if format == "parquet" and pq is None:
+            logger.warning("pyarrow is not installed, cannot export Parquet")
+            return None
+        extension = "parquet" if format == "parquet" else "csv" + {"gzip": ".gz", "zstd": ".zst"}.get(content_encoding, "")
+
+        try:
+            ranges = [("", ())]
+            if key_column and partitions > 1:
+                ranges = self._key_ranges(table,key_column,partitions)
+            if len(ranges) == 1:
+                keys = [s3_key]
+            else:
+                keys = [f"{s3_key.rstrip('/')}/part-{n:04d}.{extension}" for n in range(len(ranges))]
+
+            def export(job):
+                key, (where, params) = job
+                if self.slots is None or len(ranges) == 1:
+                    self._export_range(self.conn,table,s3,key,format,content_encoding,where,params,batch_rows)
+                    self.conn.rollback()  #ends the read transaction opened by the export
+                else:
+                    with self.connection() as conn:
+                        self._export_range(conn,table,s3,key,format,content_encoding,where,params,batch_rows)
+
+            jobs = list(zip(keys, ranges))
+            if self.slots is None or len(jobs) == 1:
+                for job in jobs:
+                    export(job)
+            else:
+                workers = min(workers or self.max_connections - 1, self.max_connections - 1)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(export, jobs))
+
+            logger.info("Exported %s to %s S3 object(s) under: %s", table, len(keys), s3_key)
+            return keys
         except Exception as e:
-            logger.warning(f"CSV export failed: {e}")
+            self.conn.rollback()
+            logger.warning("Export of %s to S3 failed: %s", table, e)
+            return None
+
+    def _key_ranges(self,table,key_column,partitions):
+        """Splits [min, max] of an integer key into partitions half-open WHERE clauses."""
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"SELECT min({key_column}), max({key_column}) FROM {table}")
+            low, high = cursor.fetchone()
+        self.conn.rollback()
+        if low is None:
+            return [("", ())]
+        step = max(1, -(-(high - low + 1) // partitions))
+        return [
+            (f" WHERE {key_column} >= %s AND {key_column} < %s", (start, min(start + step, high + 1)))
+            for start in range(low, high + 1, step)
+        ]
+
+    def _export_range(self,conn,table,s3,s3_key,format,content_encoding,where,params,batch_rows):
+        if format == "parquet":
+            #parquet pages are already compressed, never add a content encoding on top
+            with s3.open_writer(s3_key,content_encoding="",content_type="application/vnd.apache.parquet") as sink:
+                with conn.cursor(name=f"export_{next(_cursor_ids)}") as cursor:
+                    cursor.itersize = batch_rows
+                    cursor.execute(f"SELECT * FROM {table}{where}",params)
+                    writer = None
+                    try:
+                        for chunk in self._fetch_frames(cursor,batch_rows):
+                            batch = pa.Table.from_pandas(
+                                chunk,
+                                schema=writer.schema if writer else None,
+                                preserve_index=False
+                                )
+                            if writer is None:
+                                writer = pq.ParquetWriter(sink,batch.schema,compression="snappy")
+                            writer.write_table(batch,row_group_size=batch_rows)
+                    finally:
+                        if writer is not None:
+                            writer.close()
+            return
+
+        with s3.open_writer(s3_key,content_encoding=content_encoding,content_type="text/csv") as sink:
+            with conn.cursor() as cursor:
+                sql = cursor.mogrify(f"COPY (SELECT * FROM {table}{where}) TO STDOUT WITH CSV HEADER",params)
+                with timer("pg.copy_to"):
+                    cursor.copy_expert(sql.decode(),sink,size=256 * 1024)
+
+    def column_types(self,table,conn=None):
+        """Returns {column: type name} for a table, as used by binary COPY."""
+        conn = conn or self.conn
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT a.attname, t.typname
+                FROM pg_attribute a
+                JOIN pg_type t ON a.atttypid = t.oid
+                WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+                """,
+                (table,)
+            )
+            return dict(cursor.fetchall())
+
+    def _copy_df(self,conn,data,table,chunk_rows=10_000,format="csv"):
+        """
+        Streams a DataFrame (or an iterator of DataFrame chunks) through COPY in
+        chunk_rows slices, so only one encoded slice is in memory at a time.
+        format="binary" sends PostgreSQL's binary COPY format typed to the target
+        columns. Returns the number of rows sent, the caller commits.
+        """
+        frames = iter_frames(data,chunk_rows)
+        first = next(frames,None)
+        if first is None:
+            return 0
+        frames = chain([first],frames)
+
+        rows = 0
+        def counted(frames):
+            nonlocal rows
+            for df in frames:
+                rows += len(df)
+                yield df
 
-    def copy_from_df(self,df,table):
+        columns = ','.join(first.columns)
+        if format == "binary":
+            column_types = self.column_types(table,conn)
+            missing = [col for col in first.columns if col not in column_types]
+            if missing:
+                raise ValueError(f"Columns {missing} not found in {table}")
+            stream = CopyStream(iter_binary_chunks(counted(frames),column_types))
+            sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)"
+        else:
+            stream = CopyStream(iter_csv_chunks(counted(frames)))
+            sql = f"COPY {table} ({columns}) FROM STDIN WITH CSV"
+
+        #includes encoding time, pg.encode_* on its own shows how much of it is client side
+        with timer("pg.copy") as timing, conn.cursor() as cursor:
+            cursor.copy_expert(sql,stream,size=64 * 1024)
+            timing.rows, timing.bytes = rows, stream.bytes_read
+        return rows
+
+    def copy_from_df(self,df,table,chunk_rows=10_000,format="csv"):
         """
         Efficiently loads a DataFrame into a PostgreSQL table using COPY.
+        df can also be an iterator of DataFrame chunks; rows are encoded lazily in
+        chunk_rows slices so memory stays flat regardless of the input size.
+        format: "csv" or "binary" (typed binary COPY, no text parsing on the server)
         Rolls back on failure and logs meaningful messages.
         """
+        try:
+            if isinstance(df,pd.DataFrame) and df.empty:
+                logger.warning("DataFrame is empty. Skipping insert to %s", table)
+                return False
+
+            rows = self._copy_df(self.conn,df,table,chunk_rows,format)
+            if rows == 0:
+                logger.warning("No rows to insert. Skipping insert to %s", table)
+                self.conn.rollback()
+                return False
+            self.conn.commit()
+
+            logger.info("Data inserted into: %s (%s rows)", table, rows)
+            return True
+        
+        except Exception as e:
+            logger.warning("Data export failed: %s", e)
+            self.conn.rollback()
+            return False
+
+    def ensure_list_partition(self,parent,like_table,column,value):
+        """
+        Creates parent as LIKE like_table plus an integer column, partitioned BY LIST
+        (column), and the partition of parent holding value, unless they exist.
+        Returns the partition name (parent_<value>). Run it before loading in parallel,
+        concurrent CREATE TABLE IF NOT EXISTS on the same table can still collide.
+        """
+        partition = f"{parent}_{value}"
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {parent} "
+                    f"(LIKE {like_table} INCLUDING DEFAULTS, {column} integer NOT NULL) "
+                    f"PARTITION BY LIST ({column})"
+                    )
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {parent} FOR VALUES IN (%s)",
+                    (int(value),)
+                    )
+            self.conn.commit()
+            logger.info("Partition ready: %s", partition)
+            return partition
+        except Exception as e:
+            self.conn.rollback()
+            logger.error("Could not create partition %s: %s", partition, e)
+            return None
+
+    def replace_from_df(self,df,table,format="csv"):
+        """
+        Replaces the whole content of table (e.g. one season partition) with df:
+        TRUNCATE and COPY in a single transaction, so reruns are idempotent and
+        readers never see a half-loaded table.
+        """
+        try:
+            if df is None or df.empty:
+                logger.warning("DataFrame is empty. Skipping replace of %s", table)
+                return False
+
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {table}")
+            rows = self._copy_df(self.conn,df,table,format=format)
+            self.conn.commit()
+
+            logger.info("Replaced contents of: %s (%s rows)", table, rows)
+            return True
+
+        except Exception as e:
+            logger.warning("Replace of %s failed: %s", table, e)
+            self.conn.rollback()
+            return False
+
+    def upsert_from_df(self,df,table,key_columns=("id",),delete_missing=False,delete_scope=None,format="csv"):
+        """
+        Idempotent load: COPY into a temp staging table, then one set-based
+        INSERT ... ON CONFLICT (key_columns) DO UPDATE, all in a single transaction.
+        Only rows whose values actually changed are rewritten.
+
+        delete_missing: also delete target rows whose key is not in the DataFrame
+        delete_scope:   limit that delete to rows sharing a value of this column with
+                        the DataFrame (e.g. 'team_id' replaces only the loaded rosters)
+        The target table needs a unique constraint on key_columns.
+        """
         try:
             if df.empty:
-                logger.warning(f"DataFrame is empty. Skipping insert to {table}")
+                logger.warning("DataFrame is empty. Skipping upsert to %s", table)
                 return False
 
-            #Writes DataFrame to memory
-            buffer = StringIO()
-            df.to_csv(buffer, header=False,index=False)
-            buffer.seek(0)
+            key_columns = list(key_columns)
+            columns = list(df.columns)
+            column_list = ','.join(columns)
+            key_list = ','.join(key_columns)
+            update_columns = [col for col in columns if col not in key_columns]
+            staging = f"_stage_{table.split('.')[-1]}"
 
-            columns = ','.join(df.columns)
-            sql = f"COPY {table} ({columns}) FROM STDIN WITH CSV"
+            if update_columns:
+                assignments = ','.join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+                target_values = ','.join(f"{table}.{col}" for col in update_columns)
+                excluded_values = ','.join(f"EXCLUDED.{col}" for col in update_columns)
+                conflict_action = (
+                    f"DO UPDATE SET {assignments} "
+                    f"WHERE ROW({target_values}) IS DISTINCT FROM ROW({excluded_values})"
+                )
+            else:
+                conflict_action = "DO NOTHING"
 
             with self.conn.cursor() as cursor:
-                cursor.copy_expert(sql,buffer)
+                cursor.execute(
+                    f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+                self._copy_df(self.conn,df,staging,format=format)
+
+                #DISTINCT ON keeps one row per key so a batch can't hit the same row twice
+                with timer("pg.upsert_merge", rows=len(df)):
+                    cursor.execute(
+                        f"INSERT INTO {table} ({column_list}) "
+                        f"SELECT DISTINCT ON ({key_list}) {column_list} FROM {staging} "
+                        f"ON CONFLICT ({key_list}) {conflict_action}"
+                        )
+                upserted = cursor.rowcount
+
+                deleted = 0
+                if delete_missing:
+                    key_match = ' AND '.join(f"s.{col} = t.{col}" for col in key_columns)
+                    scope = (
+                        f" AND t.{delete_scope} IN (SELECT DISTINCT {delete_scope} FROM {staging})"
+                        if delete_scope else ""
+                    )
+                    cursor.execute(
+                        f"DELETE FROM {table} t WHERE NOT EXISTS "
+                        f"(SELECT 1 FROM {staging} s WHERE {key_match}){scope}"
+                        )
+                    deleted = cursor.rowcount
             self.conn.commit()
 
-            logger.info(f"Data inserted into: {table} ({len(df)} rows)")
+            logger.info("Upserted into: %s (%s staged, %s written, %s deleted)", table, len(df), upserted, deleted)
             return True
-        
+
         except Exception as e:
-            logger.warning(f"Data export failed: {e}")
+            logger.warning("Upsert into %s failed: %s", table, e)
             self.conn.rollback()
             return False
 
+    def copy_many(self,frames,batch_rows=50_000,workers=None,format="csv"):
+        """
+        Loads several DataFrames ({table: df}) concurrently over pooled connections.
+        Each DataFrame is split into batches of batch_rows; every batch is COPYed and
+        committed atomically on its own connection. Returns True when every batch loaded.
+        """
+        if self.slots is None:
+            return all(self.copy_from_df(df,table,format=format) for table, df in frames.items())
+
+        batches = [
+            (table, df.iloc[start:start + batch_rows])
+            for table, df in frames.items() if df is not None and not df.empty
+            for start in range(0, len(df), batch_rows)
+        ]
+        if not batches:
+            logger.warning("All DataFrames are empty. Skipping parallel insert")
+            return False
+
+        def load(batch):
+            table, df = batch
+            try:
+                with self.connection() as conn:
+                    self._copy_df(conn,df,table,format=format)
+                return True
+            except Exception as e:
+                logger.warning("Batch load into %s failed (%s rows): %s", table, len(df), e)
+                return False
+
+        workers = min(workers or self.max_connections - 1, self.max_connections - 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(load, batches))
+
+        loaded = sum(len(df) for (_, df), ok in zip(batches, results) if ok)
+        logger.info("Parallel load finished: %s/%s batches, %s rows", results.count(True), len(batches), loaded)
+        return all(results)
+
+    def copy_from_df_parallel(self,df,table,batch_rows=50_000,workers=None,format="csv"):
+        """Splits one large DataFrame across several pooled connections (see copy_many)."""
+        return self.copy_many({table: df},batch_rows=batch_rows,workers=workers,format=format)
+
     def close(self):
         try:
             self.cursor.close()
-            self.conn.close()
+            self.pool.putconn(self.conn)
+            self.pool.closeall()
             logger.info("PostgreSQL Connection is closed!")
         except Exception as e:
-            logger.warning(f"There was trouble closing the connection: {e}")
+            logger.warning("There was trouble closing the connection: %s", e)
             return False
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+- Single-pass, chunk-mergeable data profiling (nulls, dtypes, min/max, distinct estimates, duplicates)
+"""
+import math
+import numpy as np
+import pandas as pd
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+UINT64_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+def hash_values(data):
+    """64-bit hashes for a Series (one per value) or a DataFrame (one per row)."""
+    return pd.util.hash_pandas_object(data, index=False).to_numpy(dtype=np.uint64)
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch with 2**precision registers (~1.04 / sqrt(2**precision) error,
+    about 1.6% at the default precision of 12). Sketches from separate chunks merge exactly.
+    """
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = (hashes << p) & UINT64_MASK
+        #rank = position of the leftmost 1 bit in the remaining 64 - p bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        np.minimum(bit_length, 64, out=bit_length)  #float rounding near 2**64
+        rank = np.where(nonzero, 64 - bit_length + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  #linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class ExactKeySet:
+    """Duplicate detector keeping every key hash (exact, memory grows with distinct keys)."""
+    def __init__(self):
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def add_hashes(self, hashes):
+        """Adds hashes in order and returns how many were already present."""
+        unique = np.unique(hashes)
+        within_chunk = len(hashes) - len(unique)
+        across_chunks = int(np.count_nonzero(np.isin(unique, self.seen, assume_unique=True)))
+        self.seen = np.union1d(self.seen, unique)
+        return within_chunk + across_chunks
+
+    def merge(self, other):
+        """Merges another chunk's keys, returning the number of keys both had seen."""
+        overlap = int(np.count_nonzero(np.isin(other.seen, self.seen, assume_unique=True)))
+        self.seen = np.union1d(self.seen, other.seen)
+        return overlap
+
+
+class BloomKeySet:
+    """
+    Duplicate detector in fixed memory sized for capacity keys at error_rate false positives.
+    A false positive counts a new key as a duplicate, so counts are an upper bound.
+    Merging ORs the bit arrays; duplicates split across separately profiled chunks are
+    not counted (merge returns 0), profile related chunks on the same profiler instead.
+    """
+    def __init__(self, capacity=1_000_000, error_rate=0.01):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros(self.size, dtype=bool)
+
+    def _positions(self, hashes):
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        steps = np.arange(self.hash_count, dtype=np.int64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % self.size
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return 0
+        #duplicates inside the chunk are exact, the filter only answers for earlier chunks
+        unique, first_index = np.unique(hashes, return_index=True)
+        within_chunk = len(hashes) - len(unique)
+        unique = unique[np.argsort(first_index)]
+        positions = self._positions(unique)
+        across_chunks = int(np.count_nonzero(self.bits[positions].all(axis=1)))
+        self.bits[positions.ravel()] = True
+        return within_chunk + across_chunks
+
+    def merge(self, other):
+        np.logical_or(self.bits, other.bits, out=self.bits)
+        return 0
+
+
+class ColumnProfile:
+    def __init__(self, expected_dtype=None, hll_precision=12):
+        self.expected_dtype = expected_dtype
+        self.count = 0
+        self.nulls = 0
+        self.nonconforming = 0
+        self.dtypes = set()
+        self.min = None
+        self.max = None
+        self.distinct = HyperLogLog(hll_precision)
+
+    def update(self, series):
+        values = series.dropna()
+        self.count += len(series)
+        self.nulls += len(series) - len(values)
+        self.dtypes.add(series.dtype.name)
+        if values.empty:
+            return
+
+        self.distinct.add_hashes(hash_values(values))
+        if self.expected_dtype is not None:
+            self.nonconforming += self._count_nonconforming(values)
+        try:
+            low, high = values.min(), values.max()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        except TypeError:
+            pass  #mixed, unorderable values
+
+    def _count_nonconforming(self, values):
+        expected = self.expected_dtype
+        if values.dtype.name == expected:
+            return 0
+        try:
+            if expected.lower().startswith(("int", "uint", "float")):
+                converted = pd.to_numeric(values, errors="coerce")
+                failed = converted.isna()
+                if expected.lower().startswith(("int", "uint")):
+                    failed |= converted.notna() & (converted % 1 != 0)
+                return int(failed.sum())
+            if expected.startswith("datetime") or expected == "date":
+                return int(pd.to_datetime(values, errors="coerce").isna().sum())
+            if expected == "bool":
+                return int((~values.isin([True, False])).sum())
+        except Exception:
+            return len(values)
+        return 0 if expected in ("object", "string", "category") else len(values)
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.nonconforming += other.nonconforming
+        self.dtypes |= other.dtypes
+        for attr, pick in (("min", min), ("max", max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            try:
+                setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+            except TypeError:
+                pass
+        self.distinct.merge(other.distinct)
+        return self
+
+    def report(self):
+        return {
+            "nulls": self.nulls,
+            "null_ratio": self.nulls / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "distinct_estimate": self.distinct.count(),
+            "dtypes": sorted(self.dtypes),
+            "expected_dtype": self.expected_dtype,
+            "nonconforming": self.nonconforming,
+        }
+
+
+class DataProfiler:
+    """
+    Profiles data in one pass per chunk: null counts, dtype conformance, min/max,
+    HyperLogLog distinct estimates per column and duplicate detection on key_columns
+    (whole rows when None). Call update() for each chunk; profilers built on separate
+    chunks (e.g. in parallel workers) can be combined with merge().
+
+    dedupe: "exact" keeps a hash set of keys, "bloom" uses a fixed-size Bloom filter
+    """
+    def __init__(self, key_columns=None, expected_dtypes=None, dedupe="exact",
+                 bloom_capacity=1_000_000, bloom_error=0.01, hll_precision=12):
+        self.key_columns = list(key_columns) if key_columns else None
+        self.expected_dtypes = expected_dtypes or {}
+        self.hll_precision = hll_precision
+        self.rows = 0
+        self.duplicates = 0
+        self.columns = {}
+        if dedupe == "bloom":
+            self.keys = BloomKeySet(bloom_capacity, bloom_error)
+        elif dedupe == "exact":
+            self.keys = ExactKeySet()
+        else:
+            raise ValueError(f"Unknown dedupe mode: {dedupe}")
+
+    def update(self, df):
+        if df is None or df.empty:
+            return self
+        self.rows += len(df)
+
+        for col in df.columns:
+            profile = self.columns.get(col)
+            if profile is None:
+                profile = self.columns[col] = ColumnProfile(self.expected_dtypes.get(col), self.hll_precision)
+            profile.update(df[col])
+
+        keys = df[self.key_columns] if self.key_columns else df
+        self.duplicates += self.keys.add_hashes(hash_values(keys))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.duplicates += other.duplicates + self.keys.merge(other.keys)
+        for col, profile in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(profile)
+            else:
+                self.columns[col] = profile
+        return self
+
+    def report(self):
+        missing = sorted(set(self.expected_dtypes) - set(self.columns))
+        return {
+            "rows": self.rows,
+            "duplicates": self.duplicates,
+            "key_columns": self.key_columns,
+            "missing_columns": missing,
+            "columns": {col: profile.report() for col, profile in self.columns.items()},
+        }
+
+    @classmethod
+    def profile(cls, chunks, **kwargs):
+        """Profiles a DataFrame or an iterable of DataFrame chunks."""
+        profiler = cls(**kwargs)
+        for chunk in ([chunks] if isinstance(chunks, pd.DataFrame) else chunks):
+            profiler.update(chunk)
+        return profiler
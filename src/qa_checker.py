@@ -4,6 +4,7 @@ from utilities.logger import get_logger
 logger = get_logger(__name__)
 
 import pandas as pd
+from src.profiler import DataProfiler
 
 class DataQualityChecker:
     def __init__(self,df):
@@ -15,25 +16,26 @@ class DataQualityChecker:
             nulls_by_column = nulls_by_column[nulls_by_column >0]
 
             if not nulls_by_column.empty:
-                logger.warning(f"There are nulls in the data: {nulls_by_column}")
+                logger.warning("There are nulls in the data: %s", nulls_by_column)
             else:
                 logger.info("There are no nulls in the data set")
             return nulls_by_column
         except Exception as e:
-            logger.exception(f"Exception in check_nulls: {e}")
+            logger.exception("Exception in check_nulls: %s", e)
             return None 
 
-    def check_duplicates(self):
+    def check_duplicates(self,key_columns=None):
+        #key_columns (e.g. ['id']) also catches the same player listed under two teams
         try:
-            dupes_count = self.df.duplicated().sum() 
+            dupes_count = self.df.duplicated(subset=key_columns).sum() 
 
             if dupes_count > 0:
-                logger.warning(f"There are duplicates in the data: {dupes_count}")
+                logger.warning("There are duplicates in the data: %s", dupes_count)
             else:
                 logger.info("There are no duplicates in the data set")
             return dupes_count
         except Exception as e:
-            logger.exception(f"Exception in check_duplicates: {e}")
+            logger.exception("Exception in check_duplicates: %s", e)
             return None
 
 
@@ -46,15 +48,15 @@ class DataQualityChecker:
                 missing = expected_columns - actual_columns
                 extra = actual_columns - expected_columns
                 if missing:
-                    logger.warning(f"Missing columns: {missing}")
+                    logger.warning("Missing columns: %s", missing)
                 if extra:
-                    logger.warning(f"Unexpected columns: {extra}")
+                    logger.warning("Unexpected columns: %s", extra)
                 return {"missing": missing, "extra": extra} if missing or extra else actual_columns
             else:
                 logger.info("No schema drift detected.")
             return actual_columns
         except Exception as e:
-            logger.exception(f"Exception in check_schema: {e}")
+            logger.exception("Exception in check_schema: %s", e)
             return None
     
     def check_data_types(self,expected_dtypes):
@@ -73,13 +75,57 @@ class DataQualityChecker:
                         "actual": actual_type
                         }
             if mismatched:
-                logger.warning(f"Mismatched data types: {mismatched}")
+                logger.warning("Mismatched data types: %s", mismatched)
             else:
-                logger.info(f"All column data types match expected types.")
+                logger.info("All column data types match expected types.")
             return mismatched if mismatched else actual_dtypes
         
         except Exception as e:
-            logger.exception(f"Exception in check_data_types: {e}")
+            logger.exception("Exception in check_data_types: %s", e)
             return None
 
-    
\ No newline at end of file
+    def profile(self,key_columns=None,expected_dtypes=None,dedupe="exact",chunk_rows=None):
+        """
+        Runs every check in a single pass with DataProfiler: null counts, dtype
+        conformance, min/max, distinct estimates and duplicates on key_columns.
+        chunk_rows profiles the frame in slices to bound the working memory.
+        """
+        try:
+            if chunk_rows:
+                chunks = (self.df.iloc[start:start + chunk_rows] for start in range(0, len(self.df), chunk_rows))
+            else:
+                chunks = self.df
+            report = DataProfiler.profile(
+                chunks, key_columns=key_columns, expected_dtypes=expected_dtypes, dedupe=dedupe
+                ).report()
+            log_profile(report)
+            return report
+        except Exception as e:
+            logger.exception("Exception in profile: %s", e)
+            return None
+
+def log_profile(report):
+    """Logs the findings of a DataProfiler report the same way the individual checks do."""
+    nulls = {col: stats["nulls"] for col, stats in report["columns"].items() if stats["nulls"]}
+    if nulls:
+        logger.warning("There are nulls in the data: %s", nulls)
+    else:
+        logger.info("There are no nulls in the data set")
+
+    if report["duplicates"]:
+        logger.warning("There are duplicates in the data: %s", report['duplicates'])
+    else:
+        logger.info("There are no duplicates in the data set")
+
+    if report["missing_columns"]:
+        logger.warning("Missing columns: %s", set(report['missing_columns']))
+
+    mismatched = {
+        col: {"expected": stats["expected_dtype"], "actual": stats["dtypes"], "nonconforming": stats["nonconforming"]}
+        for col, stats in report["columns"].items()
+        if stats["expected_dtype"] is not None and stats["nonconforming"]
+    }
+    if mismatched:
+        logger.warning("Mismatched data types: %s", mismatched)
+    else:
+        logger.info("All column data types match expected types.")
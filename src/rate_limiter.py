@@ -0,0 +1,99 @@
+"""
+- Token bucket rate limiter shared by every API call in the pipeline
+"""
+import time
+import threading
+from multiprocessing.managers import BaseManager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+class RateLimiter:
+    """
+    Thread-safe token bucket sized from the API tier.
+
+    calls_per_minute: sustained request budget (free tier is 5)
+    burst:            how many requests may go out back to back. Defaults to 1 so
+                      requests are evenly spaced and never trip a per-minute window.
+
+    Every worker calls acquire() before sending a request. When the API answers
+    with a 429 the caller hands the wait time to penalize(), which empties the
+    bucket and blocks all workers until the server says it is safe again.
+    """
+    def __init__(self, calls_per_minute, burst=1):
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be greater than 0")
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def max_in_flight(self):
+        """Number of workers that can be kept busy without waiting on the bucket."""
+        return self.capacity
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Drains the bucket and pauses every caller for the given number of seconds."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = 0.0
+            self.updated = now
+            self.blocked_until = max(self.blocked_until, now + seconds)
+        logger.warning("Rate limit hit, pausing API calls for %.1fs", seconds)
+
+
+class RateLimiterManager(BaseManager):
+    """
+    Hosts RateLimiter instances in a manager process so several worker processes
+    share one global rate budget:
+
+        with RateLimiterManager() as manager:
+            limiter = manager.RateLimiter(calls_per_minute=5)
+            # pass limiter to processes, acquire()/penalize() go through the manager
+
+    Proxies only expose methods, use the calls_per_minute/burst you created it with
+    instead of max_in_flight.
+    """
+
+RateLimiterManager.register("RateLimiter", RateLimiter)
+
+
+def retry_after_seconds(response, attempt, base_delay=1.0, max_delay=60.0):
+    """
+    Returns how long to wait after a 429 response.
+    Honors the Retry-After header (seconds or HTTP date) and falls back to
+    exponential backoff when the header is missing.
+    """
+    header = response.headers.get("Retry-After") if response is not None else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(header)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    return min(max_delay, base_delay * (2 ** attempt))
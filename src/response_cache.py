@@ -0,0 +1,137 @@
+"""
+- On-disk cache of API responses keyed by request URL
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+#stored_at is written before the body, so it is found without reading the whole entry
+STORED_AT = re.compile(rb'"stored_at": ([0-9.eE+-]+)')
+
+class ResponseCache:
+    """
+    Stores one JSON file per URL (body + ETag/Last-Modified) under cache_dir.
+
+    ttl:       seconds an entry is served without touching the network. After that
+               the entry is revalidated with a conditional request.
+    max_age:   entries older than this are evicted (None keeps them for revalidation)
+    max_bytes: total size cap for the cache directory, least recently used entries
+               are evicted first
+    """
+    def __init__(self, cache_dir, ttl=3600, max_age=None, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Unreadable cache entry for %s, ignoring: %s", url, e)
+            return None
+
+        if self.max_age is not None and time.time() - entry["stored_at"] > self.max_age:
+            self._remove(path)
+            return None
+        os.utime(path)  #mark as recently used for size eviction
+        return entry
+
+    def is_fresh(self, entry):
+        return self.ttl is not None and time.time() - entry["stored_at"] <= self.ttl
+
+    def put(self, url, body, etag=None, last_modified=None):
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+            "body": body
+        }
+        self._write(url, entry)
+        if self.max_bytes is not None:
+            self.evict()
+        return entry
+
+    def touch(self, url, entry):
+        """Marks a revalidated (304) entry as fresh again."""
+        entry["stored_at"] = time.time()
+        self._write(url, entry)
+        return entry
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _stored_at(self, path):
+        with open(path, "rb") as f:
+            match = STORED_AT.search(f.read(8192))
+        if match:
+            return float(match.group(1))
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["stored_at"]
+
+    def evict(self):
+        """
+        Drops entries stored (or revalidated) more than max_age ago, then least recently
+        used entries (file mtime, updated on every read) until under max_bytes.
+        """
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            now = time.time()
+            if self.max_age is not None:
+                kept = []
+                for entry in entries:
+                    try:
+                        expired = now - self._stored_at(entry[2]) > self.max_age
+                    except FileNotFoundError:
+                        continue
+                    except Exception:
+                        expired = True  #unreadable entries would never be served anyway
+                    if expired:
+                        self._remove(entry[2])
+                    else:
+                        kept.append(entry)
+                entries = kept
+
+            if self.max_bytes is not None:
+                total = sum(size for _, size, _ in entries)
+                for _, size, path in sorted(entries):
+                    if total <= self.max_bytes:
+                        break
+                    self._remove(path)
+                    total -= size
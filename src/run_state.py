@@ -0,0 +1,106 @@
+"""
+- Local run-state store used to checkpoint pipeline stages and resume interrupted runs
+"""
+import os
+import json
+import threading
+import uuid
+from datetime import datetime
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+class RunState:
+    """
+    Records completed (stage, partition) pairs for one run under state_dir/<run_id>/.
+
+    state.json holds the checkpoints and is rewritten atomically on every change, so a
+    crash never leaves it half written. Payloads (e.g. fetched API responses) are
+    stored next to it so a resumed run can rebuild its inputs without the API, and
+    removed once the run completes.
+
+    Run ids start with the start time, so they sort in start order; the random suffix
+    keeps runs started within the same second apart.
+    """
+    def __init__(self, state_dir, run_id=None):
+        self.run_id = run_id or f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.run_dir = os.path.join(state_dir, self.run_id)
+        self.state_path = os.path.join(self.run_dir, "state.json")
+        self.lock = threading.Lock()
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        self.state = {"run_id": self.run_id, "completed": False, "checkpoints": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+            logger.info("Resuming run %s with %s checkpoints", self.run_id, self.checkpoint_count())
+
+    @classmethod
+    def latest(cls, state_dir):
+        """
+        Returns the most recent run if it did not complete, or None. Older runs are never
+        picked up, their checkpoints predate whatever the newest run already loaded.
+        """
+        if not os.path.isdir(state_dir):
+            return None
+        runs = [
+            run_id for run_id in os.listdir(state_dir)
+            if os.path.exists(os.path.join(state_dir, run_id, "state.json"))
+        ]
+        if not runs:
+            return None
+        run_id = max(runs)
+        with open(os.path.join(state_dir, run_id, "state.json"), "r", encoding="utf-8") as f:
+            if json.load(f).get("completed"):
+                logger.info("Latest run %s completed, nothing to resume", run_id)
+                return None
+        return cls(state_dir, run_id)
+
+    @property
+    def completed(self):
+        return self.state["completed"]
+
+    def checkpoint_count(self):
+        return sum(len(partitions) for partitions in self.state["checkpoints"].values())
+
+    def is_done(self, stage, partition="all"):
+        return str(partition) in self.state["checkpoints"].get(stage, {})
+
+    def get(self, stage, partition="all"):
+        return self.state["checkpoints"].get(stage, {}).get(str(partition))
+
+    def mark_done(self, stage, partition="all", **info):
+        with self.lock:
+            info["completed_at"] = datetime.now().isoformat(timespec="seconds")
+            self.state["checkpoints"].setdefault(stage, {})[str(partition)] = info
+            self._save()
+
+    def mark_complete(self):
+        """Marks the run complete and removes its payloads, only state.json is kept."""
+        with self.lock:
+            self.state["completed"] = True
+            self._save()
+            for name in os.listdir(self.run_dir):
+                if name.endswith(".bin"):
+                    os.remove(os.path.join(self.run_dir, name))
+        logger.info("Run %s marked complete", self.run_id)
+
+    def save_payload(self, stage, partition, data: bytes):
+        path = self._payload_path(stage, partition)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load_payload(self, stage, partition):
+        with open(self._payload_path(stage, partition), "rb") as f:
+            return f.read()
+
+    def _payload_path(self, stage, partition):
+        return os.path.join(self.run_dir, f"{stage}_{partition}.bin")
+
+    def _save(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
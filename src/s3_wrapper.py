@@ -1,21 +1,55 @@
 #boiler plate code needed for the logger to work
 import sys,os
 from utilities.logger import get_logger
+from utilities.metrics import timer, timed
+from src.s3_writer import S3MultipartWriter
 logger = get_logger(__name__)
 
 import boto3 
+from botocore.config import Config
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from io import StringIO
+from io import StringIO, BytesIO
+import gzip
 import json
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MB = 1024 * 1024
+
 class S3Wrapper:
-    def __init__(self,aws_access_key_id,aws_secret_access_key,region,bucket):
+    """
+    max_workers:         default thread count for upload_many (also sizes the client's connection pool)
+    content_encoding:    default encoding for uploads: None, 'gzip' or 'zstd' (needs the zstandard package)
+    multipart_threshold: bodies at or above this size go through a multipart upload
+    """
+    def __init__(self,aws_access_key_id,aws_secret_access_key,region,bucket,
+                 max_workers=8,content_encoding=None,multipart_threshold=8*MB,multipart_chunksize=8*MB):
         self.bucket = bucket
+        self.max_workers = max_workers
+        self.content_encoding = content_encoding
         self.s3_client = boto3.client(
         's3',
         aws_access_key_id = aws_access_key_id,
         aws_secret_access_key = aws_secret_access_key,
-        region_name = region
+        region_name = region,
+        config = Config(max_pool_connections=max(10, max_workers))
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_workers
         )
         self.dt_format = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
     
@@ -23,29 +57,93 @@ class S3Wrapper:
 
         try:
             self.s3_client.upload_file(source_path,self.bucket,f"{self.dt_format}_{file_name}")
-            logger.info(f"Object successfully uploaded to: {self.bucket}")
+            logger.info("Object successfully uploaded to: %s", self.bucket)
         except Exception as e:
-            logger.exception(f"Exception occured at s3_upload: {e}")
+            logger.exception("Exception occured at s3_upload: %s", e)
             return None
     
     def s3_download(self,object_name,landing_path):
         
         try:
             self.s3_client.download_file(self.bucket,object_name,landing_path)
-            logger.info(f"Object successfully downloaded to: {landing_path}")
+            logger.info("Object successfully downloaded to: %s", landing_path)
         except Exception as e:
-            logger.exception(f"Exception occured at s3_download: {e}")
+            logger.exception("Exception occured at s3_download: %s", e)
             return None
     
     def s3_object_checker(self,object_name):
         try:
             self.s3_client.head_object(Bucket=self.bucket,Key=object_name)
-            logger.info(f"Object found: {object_name} in s3 bucket: {self.bucket}")
+            logger.info("Object found: %s in s3 bucket: %s", object_name, self.bucket)
             return True
         except Exception as e:
-            logger.warning(f"Object name: {object_name} not found in {self.bucket}: {e}")
+            logger.warning("Object name: %s not found in %s: %s", object_name, self.bucket, e)
             return False
     
+    def s3_get_json(self, s3_key):
+        """
+        Reads a JSON object from S3 straight into memory.
+        Returns None when the key does not exist.
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=s3_key)
+            return json.loads(self._decode_body(response))
+        except self.s3_client.exceptions.NoSuchKey:
+            logger.info("Object name: %s not found in %s", s3_key, self.bucket)
+            return None
+        except Exception as e:
+            logger.warning("Exception occured at s3_get_json: %s", e)
+            return None
+
+    def list_keys(self, prefix, suffix=None):
+        """
+        Lists every key under a prefix, following list_objects_v2 pagination.
+        """
+        keys = []
+        try:
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    if suffix is None or obj["Key"].endswith(suffix):
+                        keys.append(obj["Key"])
+            logger.info("Listed %s objects under: %s", len(keys), prefix)
+            return keys
+        except Exception as e:
+            logger.warning("Exception occured at list_keys: %s", e)
+            return None
+
+    def s3_get_bytes(self, s3_key):
+        """Downloads an object straight into memory, undoing any content encoding."""
+        with timer("s3.get_object") as timing:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=s3_key)
+            body = self._decode_body(response)
+            timing.bytes = len(body)
+        return body
+
+    def iter_objects(self, keys, max_workers=None, batch_size=None):
+        """
+        Generator yielding (s3_key, bytes) for the given keys.
+        Objects are downloaded concurrently into memory (no temp files), batch_size
+        keys at a time so only one batch is held in memory. Failed downloads are
+        logged and skipped.
+        """
+        max_workers = max_workers or self.max_workers
+        batch_size = batch_size or max_workers * 4
+        keys = list(keys)
+
+        def download(s3_key):
+            try:
+                return s3_key, self.s3_get_bytes(s3_key)
+            except Exception as e:
+                logger.warning("Exception occured downloading %s: %s", s3_key, e)
+                return s3_key, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for start in range(0, len(keys), batch_size):
+                for s3_key, body in executor.map(download, keys[start:start + batch_size]):
+                    if body is not None:
+                        yield s3_key, body
+
     def s3_upload_buffer(self, buffer:StringIO, s3_key):
         """
         Uploads a string buffer (CSV, JSON, or text) to S3 under the specified key.
@@ -57,25 +155,169 @@ class S3Wrapper:
                 Key=f"{self.dt_format}_{s3_key}", 
                 Body=buffer.getvalue()
                 )
-            logger.info(f"Object successfully uploaded to: {self.bucket}")
+            logger.info("Object successfully uploaded to: %s", self.bucket)
+            return True
             
         except Exception as e:
-            logger.warning(f"Exception occured at s3_upload_buffer: {e}")
+            logger.warning("Exception occured at s3_upload_buffer: %s", e)
             return False
     
-    def s3_upload_raw_json(self, data:dict, s3_key, include_ts=False):
+    def s3_upload_raw_json(self, data:dict, s3_key, include_ts=False, content_encoding=None):
+        key = f"{self.dt_format}_{s3_key}" if include_ts else s3_key
         try:
-            buffer = StringIO()
-            json.dump(data,buffer)
-            buffer.seek(0)
+            body = json.dumps(data).encode("utf-8")
+            if not self.s3_upload_bytes(body, key, content_encoding=content_encoding):
+                return False
+            logger.info("Raw JSON uploaded to: %s", key)
+            return True
+        except Exception as e:
+            logger.warning("Failed to upload raw JSON to: %s: %s", key, e)
+            return False
 
-            key = f"{self.dt_format}_{s3_key}" if include_ts else s3_key
+    def s3_upload_bytes(self, body:bytes, s3_key, content_encoding=None, content_type="application/json"):
+        """
+        Uploads bytes to S3 under the exact key given.
+        The body is compressed with content_encoding (None falls back to the wrapper
+        default, "" disables compression) and sent as a multipart upload when it is
+        larger than multipart_threshold.
+        """
+        encoding = self.content_encoding if content_encoding is None else content_encoding
+        try:
+            if encoding:
+                with timer(f"s3.compress_{encoding}", bytes=len(body)):
+                    body = self._encode_body(body, encoding)
+            extra_args = {"ContentType": content_type}
+            if encoding:
+                extra_args["ContentEncoding"] = encoding
 
-            self.s3_upload_buffer(buffer,key)
-            logger.info(f"Raw JSON uploaded to: {key}")
+            if len(body) >= self.transfer_config.multipart_threshold:
+                with timer("s3.multipart_upload", bytes=len(body)):
+                    self.s3_client.upload_fileobj(
+                        BytesIO(body), self.bucket, s3_key,
+                        ExtraArgs=extra_args, Config=self.transfer_config
+                        )
+            else:
+                with timer("s3.put_object", bytes=len(body)):
+                    self.s3_client.put_object(Bucket=self.bucket, Key=s3_key, Body=body, **extra_args)
+            logger.debug("Uploaded %s bytes to: %s", len(body), s3_key)
             return True
         except Exception as e:
-            logger.warning(f"Failed to upload raw JSON to: {key}")
+            logger.warning("Exception occured at s3_upload_bytes for %s: %s", s3_key, e)
             return False
 
-        
\ No newline at end of file
+    def upload_many(self, items, max_workers=None, content_encoding=None, content_type="application/json"):
+        """
+        Uploads many objects concurrently on a thread pool.
+        items: iterable of (s3_key, body) where body is bytes or JSON-serializable data.
+        Returns a {s3_key: success} dict.
+        """
+        def upload(item):
+            s3_key, body = item
+            if not isinstance(body, (bytes, bytearray)):
+                body = json.dumps(body).encode("utf-8")
+            return s3_key, self.s3_upload_bytes(
+                body, s3_key, content_encoding=content_encoding, content_type=content_type
+                )
+
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            results = dict(executor.map(upload, items))
+
+        failed = [key for key, ok in results.items() if not ok]
+        if failed:
+            logger.warning("%s of %s uploads failed: %s", len(failed), len(items), failed)
+        else:
+            logger.info("Uploaded %s objects to: %s", len(items), self.bucket)
+        return results
+
+    def open_writer(self, s3_key, content_encoding=None, content_type="application/octet-stream", part_size=None):
+        """
+        Returns a file-like S3MultipartWriter streaming into s3_key (see src/s3_writer.py).
+        content_encoding follows s3_upload_bytes (None: wrapper default, "": none) and is
+        applied on the fly; part_size defaults to multipart_chunksize.
+        """
+        encoding = self.content_encoding if content_encoding is None else content_encoding
+        return S3MultipartWriter(
+            self.s3_client, self.bucket, s3_key,
+            part_size=part_size or self.transfer_config.multipart_chunksize,
+            content_encoding=encoding,
+            content_type=content_type,
+            max_workers=self.max_workers
+            )
+
+    @timed("s3.upload_parquet")
+    def s3_upload_parquet(self, df, prefix, partition_cols=None, schema=None,
+                          compression="snappy", row_group_size=100_000, file_name=None):
+        """
+        Writes a DataFrame to S3 as Parquet, hive-partitioned by partition_cols
+        (e.g. {prefix}/season=2024/team_id=1/part-0.parquet). Partition columns are
+        encoded in the key, not the file. Each call writes a partition's full content
+        under the same file name, so a rerun overwrites it instead of adding a second
+        copy that readers would count twice. Row groups carry min/max statistics so
+        readers can prune columns and push down predicates.
+        Returns the list of keys written, or None on failure.
+        """
+        if pq is None:
+            logger.warning("pyarrow is not installed, skipping Parquet upload")
+            return None
+        if df is None or df.empty:
+            logger.warning("DataFrame is empty. Skipping Parquet upload to %s", prefix)
+            return []
+
+        partition_cols = list(partition_cols or [])
+        file_name = file_name or "part-0.parquet"
+        try:
+            if partition_cols:
+                groups = df.groupby(partition_cols, sort=False, observed=True)
+            else:
+                groups = [((), df)]
+
+            items = []
+            for values, group in groups:
+                values = values if isinstance(values, tuple) else (values,)
+                partition_path = "/".join(f"{col}={val}" for col, val in zip(partition_cols, values))
+                key = "/".join(part for part in (prefix.rstrip("/"), partition_path, file_name) if part)
+
+                table = pa.Table.from_pandas(
+                    group.drop(columns=partition_cols), schema=schema, preserve_index=False
+                    )
+                buffer = pa.BufferOutputStream()
+                pq.write_table(
+                    table, buffer,
+                    compression=compression,
+                    row_group_size=row_group_size,
+                    write_statistics=True
+                    )
+                items.append((key, buffer.getvalue().to_pybytes()))
+
+            #parquet pages are already compressed, never add a content encoding on top
+            results = self.upload_many(items, content_encoding="", content_type="application/vnd.apache.parquet")
+            if not all(results.values()):
+                return None
+            logger.info("Parquet written to %s partitions under: %s", len(items), prefix)
+            return list(results)
+        except Exception as e:
+            logger.warning("Exception occured at s3_upload_parquet: %s", e)
+            return None
+
+    def _encode_body(self, body, encoding):
+        if not encoding:
+            return body
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=6)
+        if encoding == "zstd":
+            if zstandard is None:
+                raise ImportError("zstd content encoding requires the zstandard package")
+            return zstandard.ZstdCompressor().compress(body)
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    def _decode_body(self, response):
+        body = response["Body"].read()
+        encoding = response.get("ContentEncoding")
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "zstd":
+            if zstandard is None:
+                raise ImportError("zstd content encoding requires the zstandard package")
+            return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        return body
@@ -0,0 +1,160 @@
+"""
+- File-like writer streaming into an S3 multipart upload (optionally gzip / zstd compressed)
+"""
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utilities.logger import get_logger
+from utilities.metrics import timer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = get_logger(__name__)
+
+MB = 1024 * 1024
+MIN_PART_SIZE = 5 * MB  #S3 rejects smaller parts (except the last one)
+
+def compressor(encoding):
+    """Streaming compressor with compress()/flush() for a Content-Encoding, or None."""
+    if not encoding:
+        return None
+    if encoding == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd content encoding requires the zstandard package")
+        return zstandard.ZstdCompressor().compressobj()
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+class S3MultipartWriter:
+    """
+    Accepts write() calls (bytes or str) and uploads the stream as an S3 multipart
+    upload in part_size parts, so arbitrarily large outputs (e.g. COPY TO STDOUT or a
+    ParquetWriter) go to S3 without touching local disk. Up to max_workers parts are
+    uploaded in the background while the producer keeps writing; memory is bounded
+    by about (max_workers + 1) * part_size.
+
+    Outputs smaller than one part are sent with a single put_object on close().
+    Use it as a context manager: the upload is completed on success and aborted
+    when the block raises, so no orphaned parts are left behind.
+    """
+    def __init__(self, client, bucket, key, part_size=8 * MB, content_encoding=None,
+                 content_type="application/octet-stream", max_workers=4):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(MIN_PART_SIZE, part_size)
+        self.content_encoding = content_encoding or None
+        self.content_type = content_type
+        self.compressor = compressor(self.content_encoding)
+        self.buffer = bytearray()
+        self.position = 0
+        self.bytes_uploaded = 0
+        self.upload_id = None
+        self.parts = []
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = threading.BoundedSemaphore(max_workers)
+        self.closed = False
+
+    @property
+    def extra_args(self):
+        args = {"ContentType": self.content_type}
+        if self.content_encoding:
+            args["ContentEncoding"] = self.content_encoding
+        return args
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        """Uncompressed bytes written so far (ParquetWriter asks for the position)."""
+        return self.position
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to a closed S3MultipartWriter")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.position += len(data)
+        self.buffer += self.compressor.compress(data) if self.compressor is not None else data
+        while len(self.buffer) >= self.part_size:
+            self._submit_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def flush(self):
+        pass  #parts are cut at part_size, flushing early would create undersized parts
+
+    def _submit_part(self, body):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.extra_args
+                )["UploadId"]
+        part_number = len(self.parts) + 1
+        self.in_flight.acquire()  #back-pressure: wait while max_workers parts are uploading
+        self.bytes_uploaded += len(body)
+        self.parts.append(self.executor.submit(self._upload_part, part_number, body))
+
+    def _upload_part(self, part_number, body):
+        try:
+            with timer("s3.upload_part", bytes=len(body)):
+                response = self.client.upload_part(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                    PartNumber=part_number, Body=body
+                    )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            self.in_flight.release()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.compressor is not None:
+            self.buffer += self.compressor.flush()
+        try:
+            if self.upload_id is None:
+                with timer("s3.put_object", bytes=len(self.buffer)):
+                    self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), **self.extra_args)
+                self.bytes_uploaded = len(self.buffer)
+            else:
+                if self.buffer:
+                    self._submit_part(bytes(self.buffer))
+                parts = [future.result() for future in self.parts]
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                    MultipartUpload={"Parts": parts}
+                    )
+            self.buffer = bytearray()
+            logger.info("Streamed %s bytes (%s stored) to: %s", self.position, self.bytes_uploaded, self.key)
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.closed = True
+            self.executor.shutdown(wait=True)
+
+    def abort(self):
+        self.closed = True
+        self.buffer = bytearray()
+        for future in self.parts:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        if self.upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+                logger.warning("Aborted multipart upload to: %s", self.key)
+            except Exception as e:
+                logger.warning("Could not abort multipart upload to %s: %s", self.key, e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
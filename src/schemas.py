@@ -0,0 +1,51 @@
+"""
+- Column type schemas for the cleaned frames (used by DataCleaner.apply_schema)
+- Field schemas of the raw API records (used by APIIngestion.fetch_with_raw)
+
+Schema values are pandas dtypes plus two parsers:
+    "date":     parsed with DATE_FORMAT into datetime64 (no format inference)
+    "age_days": "31 years 348 days" -> total days (years * 365 + days) as Int16
+Integer dtypes fall back to their nullable version ("int16" -> "Int16") when a column has nulls.
+
+PLAYER_SCHEMA leaves birth_date and age as the API strings: the tables store them as
+varchar, so the parsers are only for in-memory analysis (e.g. {"age": "age_days"}).
+"""
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+PLAYER_SCHEMA = {
+    "id": "int32",
+    "team_id": "int16",
+    "height": "int16",
+    "weight": "int16",
+    "position": "category",
+    "national_team": "category",
+}
+
+TEAM_SCHEMA = {
+    "id": "int16",
+}
+
+#fields decoded from the API responses, anything else stays only in the raw JSON in S3.
+#None lets pandas infer the type; numbers are left to the cleaning schemas above.
+TEAM_API_SCHEMA = {
+    "id": "int64",
+    "name": None,
+    "short_name": None,
+    "abbr": None,
+    "city": None,
+    "stadium": None,
+}
+
+PLAYER_API_SCHEMA = {
+    "id": "int64",
+    "position": None,
+    "national_team": None,
+    "height": None,
+    "weight": None,
+    "birth_date": None,
+    "age": None,
+    "name": None,
+    "first_name": None,
+    "last_name": None,
+}
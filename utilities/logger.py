@@ -1,13 +1,173 @@
+"""
+- Centralized logging, configured once per process
+
+Records are handed to a QueueHandler and written by a background QueueListener
+thread, so worker threads never block on (or contend for) the output stream.
+Configured from the environment (and .env, read here since get_logger() runs at import
+time, before the entry points load it) on the first get_logger() call:
+    LOG_LEVEL    root level (default INFO)
+    LOG_LEVELS   per-logger levels, e.g. "src.api_ingestor=DEBUG,botocore=WARNING"
+    LOG_FORMAT   text (default) or json (one object per line with run_id / stage)
+    LOG_QUEUE    0 to write synchronously from the calling thread
+
+Use %-style arguments on hot paths, they are only formatted when the level is enabled:
+    logger.debug("Uploaded %d bytes to: %s", len(body), key)
+"""
+import os
+import sys
+import json
+import queue
+import atexit
 import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import dotenv
+except ImportError:
+    dotenv = None
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+#process-wide fields (run_id) and per-thread/task fields (stage) added to every record
+_process_context = {}
+_local_context = contextvars.ContextVar("log_context", default={})
+
+_lock = threading.Lock()
+_configured = False
+_listener = None
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current log context (run_id, stage, ...) onto each record."""
+    def filter(self, record):
+        record.context = {**_process_context, **_local_context.get()}
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            **getattr(record, "context", {})
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Formats only the message (and traceback) in the calling thread, the final layout
+    (text or JSON) is left to the listener's formatter. The record is updated in place
+    instead of copied, other handlers still see the same message and traceback text.
+    """
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    """"name=LEVEL,name=LEVEL" -> {name: LEVEL}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
 
-def get_logger(name=__name__):
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s %(levelname)s %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
 
+def configure_logging(level=None, levels=None, json_format=None, use_queue=None, stream=None, force=False):
+    """
+    Installs the root handler once; arguments default to the LOG_* environment
+    variables. Returns without changes when already configured unless force=True.
+    """
+    global _configured, _listener
+    with _lock:
+        if _configured and not force:
+            return
+        stop_logging()
+
+        if dotenv is not None:
+            dotenv.load_dotenv()
+        level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+        levels = parse_levels(os.getenv('LOG_LEVELS')) if levels is None else levels
+        if json_format is None:
+            json_format = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+        if use_queue is None:
+            use_queue = os.getenv('LOG_QUEUE', '1') != '0'
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+        if use_queue:
+            #SimpleQueue is unbounded and lock-free on put, logging never blocks the producer
+            log_queue = queue.SimpleQueue()
+            handler = _QueueHandler(log_queue)
+            _listener = QueueListener(log_queue, output, respect_handler_level=True)
+            _listener.start()
+        else:
+            handler = output
+        handler.addFilter(ContextFilter())
+
+        root = logging.getLogger()
+        for existing in [h for h in root.handlers if getattr(h, "_pipeline_handler", False)]:
+            root.removeHandler(existing)
+        handler._pipeline_handler = True
+        root.addHandler(handler)
+        root.setLevel(level)
+        for name, name_level in levels.items():
+            logging.getLogger(name).setLevel(name_level)
+        _configured = True
+
+
+def stop_logging():
+    """Drains the queue and stops the listener thread (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def set_log_context(**fields):
+    """Sets fields (e.g. run_id) on every record of this process, None removes a field."""
+    for key, value in fields.items():
+        if value is None:
+            _process_context.pop(key, None)
+        else:
+            _process_context[key] = value
+
+
+@contextmanager
+def log_context(**fields):
+    """Adds fields (e.g. stage) to records logged by the current thread inside the block."""
+    token = _local_context.set({**_local_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _local_context.reset(token)
+
+
+def get_logger(name=__name__):
+    if not _configured:
+        configure_logging()
     return logging.getLogger(name)
 
 if __name__ == "__main__":
-    get_logger()
\ No newline at end of file
+    get_logger()
@@ -0,0 +1,170 @@
+"""
+- In-process metrics: latency, rows, bytes and throughput per instrumented operation
+
+Hot paths record into the module-level registry:
+
+    with timer("s3.put_object") as t:
+        ...
+        t.bytes = len(body)
+
+    @timed("api.fetch", rows=len)
+    def fetch(...): ...
+
+At the end of a run write_json() / write_prometheus() dump the summary
+(the Prometheus file is meant for node_exporter's textfile collector).
+"""
+import os
+import re
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from utilities.logger import get_logger
+
+logger = get_logger(__name__)
+
+class Timing:
+    """Handle yielded by timer(); set rows / bytes before the block ends."""
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self, rows=0, bytes=0):
+        self.rows = rows
+        self.bytes = bytes
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "seconds", "max_seconds", "rows", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def report(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 6),
+            "avg_seconds": round(self.seconds / self.count, 6) if self.count else 0.0,
+            "max_seconds": round(self.max_seconds, 6),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "rows_per_second": round(self.rows / self.seconds, 2) if self.seconds else 0.0,
+            "bytes_per_second": round(self.bytes / self.seconds, 2) if self.seconds else 0.0,
+        }
+
+
+class Metrics:
+    """
+    Thread-safe registry of OperationStats keyed by operation name.
+    Recording is a lock, a few additions and no allocation beyond the first call
+    per name, so it is cheap enough for per-request and per-chunk timers.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.started = time.time()
+
+    def record(self, name, seconds, rows=0, bytes=0, error=False):
+        with self.lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats()
+            stats.count += 1
+            stats.errors += bool(error)
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows or 0
+            stats.bytes += bytes or 0
+
+    @contextmanager
+    def timer(self, name, rows=0, bytes=0):
+        timing = Timing(rows, bytes)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield timing
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, timing.rows, timing.bytes, error)
+
+    def timed(self, name, rows=None, bytes=None):
+        """
+        Decorator timing every call of a function. rows / bytes are optional
+        callables computing the counts from the return value (None results count 0).
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name) as timing:
+                    result = func(*args, **kwargs)
+                    if result is not None:
+                        timing.rows = rows(result) if rows else 0
+                        timing.bytes = bytes(result) if bytes else 0
+                    return result
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self.lock:
+            self.operations = {}
+            self.started = time.time()
+
+    def summary(self, **extra):
+        with self.lock:
+            operations = {name: stats.report() for name, stats in sorted(self.operations.items())}
+        return {
+            "started_at": self.started,
+            "wall_seconds": round(time.time() - self.started, 3),
+            **extra,
+            "operations": operations,
+        }
+
+    def write_json(self, path, **extra):
+        summary = self.summary(**extra)
+        _write_atomic(path, json.dumps(summary, indent=2, default=str))
+        logger.info("Metrics summary written to %s", path)
+        return summary
+
+    def write_prometheus(self, path, prefix="epl_pipeline"):
+        """Writes the summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = [
+            f"# TYPE {prefix}_wall_seconds gauge",
+            f"{prefix}_wall_seconds {summary['wall_seconds']}",
+        ]
+        for field, suffix, kind in (("count", "calls_total", "counter"), ("errors", "errors_total", "counter"),
+                                    ("seconds", "seconds_total", "counter"), ("max_seconds", "max_seconds", "gauge"),
+                                    ("rows", "rows_total", "counter"), ("bytes", "bytes_total", "counter")):
+            metric = f"{prefix}_operation_{suffix}"
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, report in summary["operations"].items():
+                lines.append(f'{metric}{{operation="{_label(name)}"}} {report[field]}')
+        _write_atomic(path, "\n".join(lines) + "\n")
+        logger.info("Prometheus metrics written to %s", path)
+
+
+def _label(value):
+    return re.sub(r'["\\\n]', "_", value)
+
+def _write_atomic(path, text):
+    #the textfile collector may read at any time, never let it see a partial file
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+#shared registry for the whole process
+metrics = Metrics()
+timer = metrics.timer
+timed = metrics.timed